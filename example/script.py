@@ -2,7 +2,9 @@
 """
 import os
 from enum import Enum
-from math import exp
+from numpy import exp
+from quality_assessment.batch_report import save_batch_report
+from quality_assessment.batch_runner import run_batch, tape_files
 from quality_assessment.data_types import TapeSpecs
 from quality_assessment.quality_assessor import TapeQualityAssessor
 from quality_assessment.tape_quality_information import TapeQualityInformation
@@ -156,10 +158,6 @@ def main():
                         else expected_average)
 
     data_from_dir = "./data"
-    quality_info = tape_data(from_dir=data_from_dir,
-                             expected_average=expected_average)
-
-    # quality_info = tape_data_from_list(expected_average)
 
     save_pdf_to_dir = "./reports"
     print_reports = True
@@ -167,18 +165,28 @@ def main():
     plot_histograms = False
 
     if excecute_parallel := True:
-        # Pool does not work with lambda expressions as callable
-        from multiprocessing import Pool
-        from functools import partial
-        with Pool() as pool:
-            pool.map(
-                partial(excecute_assessment,
-                        product=product,
-                        save_pdf_to=save_pdf_to_dir,
-                        print_reports=print_reports,
-                        plot_defects=plot_defects,
-                        plot_dropout_histogram=plot_histograms), quality_info)
+        # workers load and assess the files themselves, only file paths and
+        # small summaries are sent between the processes
+        save_pdf_to = (save_pdf_to_dir if os.path.isdir(save_pdf_to_dir)
+                       else None)
+        summaries = []
+        for summary in run_batch(tape_files(data_from_dir),
+                                 CustomTapeProduct.SUPERLINK_PHASE,
+                                 expected_average,
+                                 save_pdf_to=save_pdf_to,
+                                 ordered=False):
+            summaries.append(summary)
+            if print_reports:
+                print(f"Tape {summary.tape_id} passed: {summary.passed} "
+                      f"{summary.fail_counts} {summary.error or ''}")
+        if save_pdf_to is not None:
+            # one overview of the batch next to the PDF reports
+            save_batch_report(summaries,
+                              os.path.join(save_pdf_to, "Batch Report.html"))
     else:
+        quality_info = tape_data(from_dir=data_from_dir,
+                                 expected_average=expected_average)
+        # quality_info = tape_data_from_list(expected_average)
         for info in quality_info:
             excecute_assessment(info,
                                 product,
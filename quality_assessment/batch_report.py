@@ -0,0 +1,157 @@
+""" Summary report of a batch of assessed tapes as a single HTML file
+"""
+import os
+from html import escape
+from typing import Iterable, Optional
+from .batch_runner import TapeSummary
+from .data_types import TestType
+
+SPARKLINE_WIDTH = 120
+SPARKLINE_HEIGHT = 24
+
+_STYLE = """
+body { font-family: Helvetica, Arial, sans-serif; font-size: 13px; }
+table { border-collapse: collapse; }
+th, td { border: 1px solid #bbb; padding: 2px 6px; }
+th { background: #eee; }
+td.number { text-align: right; }
+.pass { color: #1a7f37; }
+.fail { color: crimson; font-weight: bold; }
+.error { color: #888; }
+"""
+
+
+def batch_report_html(summaries: Iterable[TapeSummary],
+                      title: str = "Tape Quality Batch Report",
+                      base_dir: Optional[str] = None) -> str:
+    """ Creates the summary report of a batch of tapes with one table row per
+        tape: pass/fail and number of fails per test type, total and longest
+        OK length, and a sparkline of the trace. Only the summaries are used,
+        so no data has to be loaded again.
+
+    Args:
+        summaries (Iterable[TapeSummary]): Summaries of the assessed tapes,
+            e.g. from run_batch or TapePipeline.
+        title (str, optional): Title of the report.
+            Defaults to "Tape Quality Batch Report".
+        base_dir (str, optional): Directory the links to the PDF reports
+            are relative to. If None, the report paths are used as they are.
+            Defaults to None.
+
+    Returns:
+        str: HTML document of the report.
+    """
+    summaries = list(summaries)
+    test_types = [test_type.value for test_type in TestType
+                  if any(test_type.value in summary.fail_counts
+                         for summary in summaries)]
+    passed = sum(summary.passed for summary in summaries)
+
+    head = ["Tape ID", "Product", "Passed", *test_types,
+            "OK Length (m)", "Longest OK Section (m)", "Trace", "Report"]
+    rows = [_table_row(summary, test_types, base_dir)
+            for summary in summaries]
+    return "\n".join([
+        "<!DOCTYPE html>",
+        "<html>",
+        "<head>",
+        '<meta charset="utf-8">',
+        f"<title>{escape(title)}</title>",
+        f"<style>{_STYLE}</style>",
+        "</head>",
+        "<body>",
+        f"<h1>{escape(title)}</h1>",
+        f"<p>{passed} of {len(summaries)} tapes passed.</p>",
+        "<table>",
+        "<tr>" + "".join(f"<th>{escape(name)}</th>" for name in head)
+        + "</tr>",
+        *rows,
+        "</table>",
+        "</body>",
+        "</html>",
+        ""])
+
+
+def save_batch_report(summaries: Iterable[TapeSummary], to_path: str,
+                      title: str = "Tape Quality Batch Report") -> None:
+    """ Saves the summary report of a batch of tapes (see batch_report_html)
+        with the links to the PDF reports relative to the saved file.
+
+    Args:
+        summaries (Iterable[TapeSummary]): Summaries of the assessed tapes.
+        to_path (str): Path (incl. file name) to save the HTML file to.
+        title (str, optional): Title of the report.
+            Defaults to "Tape Quality Batch Report".
+    """
+    with open(to_path, "w", encoding="utf-8") as file:
+        file.write(batch_report_html(
+            summaries, title, os.path.dirname(os.path.abspath(to_path))))
+
+
+def sparkline_svg(values: Iterable[float],
+                  width: int = SPARKLINE_WIDTH,
+                  height: int = SPARKLINE_HEIGHT) -> str:
+    """ Draws values as a small inline SVG line, scaled from zero to the
+        largest value so that drop-outs show their depth.
+
+    Args:
+        values (Iterable[float]): Values to draw, e.g. TapeSummary.sparkline.
+        width (int, optional): Width in pixels. Defaults to SPARKLINE_WIDTH.
+        height (int, optional): Height in pixels.
+            Defaults to SPARKLINE_HEIGHT.
+
+    Returns:
+        str: SVG element, empty if there are less than two values that are
+            not NaN.
+    """
+    values = [value for value in values if value == value]
+    if len(values) < 2:
+        return ""
+    top = max(max(values), 1e-12)
+    step = width / (len(values) - 1)
+    points = " ".join(
+        f"{i * step:.1f},{height - max(value, 0.0) / top * height:.1f}"
+        for i, value in enumerate(values))
+    return (f'<svg width="{width}" height="{height}" '
+            f'viewBox="0 0 {width} {height}">'
+            f'<polyline points="{points}" fill="none" stroke="steelblue" '
+            f'stroke-width="1"/></svg>')
+
+
+def _table_row(summary: TapeSummary, test_types: list[str],
+               base_dir: Optional[str]) -> str:
+    cells = [escape(summary.tape_id), escape(summary.product)]
+    if summary.error is not None:
+        cells.append(f'<span class="error">{escape(summary.error)}</span>')
+        cells.extend([""] * (len(test_types) + 2))
+    else:
+        cells.append(_pass_fail(summary.passed))
+        for test_type in test_types:
+            count = summary.fail_counts.get(test_type)
+            cells.append("" if count is None else
+                         _pass_fail(count == 0, count))
+        lengths = [section.length for section in summary.ok_tape_sections]
+        cells.append(f"{sum(lengths):.2f}")
+        cells.append(f"{max(lengths, default=0.0):.2f}")
+    cells.append(sparkline_svg(summary.sparkline))
+    cells.append(_report_link(summary.report_path, base_dir))
+
+    numbers = {len(cells) - 4, len(cells) - 3}
+    return "<tr>" + "".join(
+        f'<td class="number">{cell}</td>' if i in numbers else
+        f"<td>{cell}</td>" for i, cell in enumerate(cells)) + "</tr>"
+
+
+def _pass_fail(passed: bool, count: Optional[int] = None) -> str:
+    if passed:
+        return '<span class="pass">pass</span>'
+    text = "fail" if count is None else f"fail ({count})"
+    return f'<span class="fail">{text}</span>'
+
+
+def _report_link(report_path: Optional[str], base_dir: Optional[str]) -> str:
+    if report_path is None:
+        return ""
+    if base_dir is not None:
+        report_path = os.path.relpath(os.path.abspath(report_path), base_dir)
+    return f'<a href="{escape(report_path.replace(os.sep, "/"))}">PDF</a>'
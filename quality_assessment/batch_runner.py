@@ -0,0 +1,600 @@
+""" Parallel assessment of many TapeStar files
+"""
+import os
+import gc
+import traceback
+from typing import Any, Callable, Iterable, Iterator, Optional, Union
+from dataclasses import dataclass, field
+from enum import Enum
+from multiprocessing import Pool, Process, Queue, resource_tracker
+from queue import Empty, Full
+from threading import Event, Thread
+from time import perf_counter
+from uuid import uuid4
+from .data_types import QualityReport, TapeSection, TapeSpecs
+from .decimation import bucket_minima
+from .helper import load_data
+from .quality_pdf_report import PlotImageSettings
+from .quality_assessor import TapeQualityAssessor
+from .tape_quality_information import TapeQualityInformation
+from .shared_trace import SharedTrace, SharedTraceHandle
+from .tape_trace import TapeTrace
+
+# Enum member holding TapeSpecs (e.g. TapeProduct.SUPERLINK_PHASE) or
+# TapeSpecs. Enum members are sent to workers by name, TapeSpecs need a
+# picklable dropout_func (no lambda).
+SpecReference = Union[Enum, TapeSpecs]
+
+# number of points of the trace preview in a TapeSummary
+SPARKLINE_POINTS = 120
+
+# seconds between checks of the pipeline's worker processes while waiting
+_POLL_INTERVAL = 0.5
+
+
+@dataclass
+class TapeSummary:
+    """ Compact result of the assessment of one tape.
+
+    Attributes:
+    -----------
+        tape_id (str): ID of the HTS tape (file name without extension)
+        file_path (str): Path of the assessed file
+        product (str): Description of the product assessed against
+        passed (bool): True if all quality tests passed
+        tape_section (Optional[TapeSection]): Section of the actual tape
+        ok_tape_sections (list[TapeSection]): Defect-free sections that are
+            long enough
+        fail_counts (dict[str, int]): Number of fails per test type
+        report_path (Optional[str]): Path of the saved PDF report
+        error (Optional[str]): Error message if the tape couldn't be assessed
+        sparkline (tuple[float, ...]): Minimum values of SPARKLINE_POINTS
+            equal parts of the tape section, a small preview of the trace
+    """
+    tape_id: str
+    file_path: str
+    product: str
+    passed: bool = False
+    tape_section: Optional[TapeSection] = None
+    ok_tape_sections: list[TapeSection] = field(default_factory=list)
+    fail_counts: dict[str, int] = field(default_factory=dict)
+    report_path: Optional[str] = None
+    error: Optional[str] = None
+    sparkline: tuple[float, ...] = ()
+
+    @classmethod
+    def from_assessor(cls, assessor: TapeQualityAssessor, file_path: str,
+                      report_path: Optional[str] = None) -> 'TapeSummary':
+        """ Summarizes the results of an assessor.
+
+        Args:
+            assessor (TapeQualityAssessor): Assessor holding the results.
+            file_path (str): Path of the assessed file.
+            report_path (str, optional): Path of the saved PDF report.
+                Defaults to None.
+
+        Returns:
+            TapeSummary: Summary of the assessment.
+        """
+        fail_counts = {}
+        for report in assessor.quality_reports:
+            if report.test_type is not None:
+                fail_counts[report.test_type.value] = (
+                    0 if report.fail_information is None else
+                    len(report.fail_information))
+
+        quality_info = assessor.tape_quality_info
+        tape_section = quality_info.tape_section
+        trace = quality_info.trace
+        first, last = trace.positions.searchsorted(
+            [tape_section.start_position, tape_section.end_position])
+        sparkline = bucket_minima(trace.values[first:last + 1],
+                                  SPARKLINE_POINTS)
+
+        return cls(tape_id=quality_info.tape_id,
+                   file_path=file_path,
+                   product=assessor.tape_specs.description,
+                   passed=all(report.passed
+                              for report in assessor.quality_reports),
+                   tape_section=tape_section,
+                   ok_tape_sections=assessor.ok_tape_sections,
+                   fail_counts=fail_counts,
+                   report_path=report_path,
+                   sparkline=tuple(sparkline.tolist()))
+
+
+@dataclass(frozen=True)
+class _WorkerSettings:
+    tape_specs: SpecReference
+    expected_average: float
+    save_pdf_to: Optional[str]
+    convert_to_meters: Optional[bool]
+    cache_dir: Optional[str]
+    shared_memory: bool = False
+    image_settings: Optional[PlotImageSettings] = None
+
+
+_worker_settings: Optional[_WorkerSettings] = None
+
+
+def tape_files(from_dir: str, extension: str = ".dat") -> list[str]:
+    """ Lists the data files in a directory.
+
+    Args:
+        from_dir (str): Directory to list the files of.
+        extension (str, optional): Extension of the data files.
+            Defaults to ".dat".
+
+    Returns:
+        list[str]: Sorted paths of the data files.
+    """
+    return sorted(
+        os.path.join(from_dir, file_name)
+        for file_name in os.listdir(from_dir)
+        if os.path.splitext(file_name)[1] == extension
+        and os.path.isfile(os.path.join(from_dir, file_name)))
+
+
+def run_batch(paths: Iterable[str],
+              tape_specs: SpecReference,
+              expected_average: float,
+              save_pdf_to: Optional[str] = None,
+              processes: Optional[int] = None,
+              chunksize: int = 1,
+              maxtasksperchild: Optional[int] = None,
+              ordered: bool = True,
+              convert_to_meters: Optional[bool] = None,
+              cache_dir: Optional[str] = None,
+              image_settings: Optional[PlotImageSettings] = None
+              ) -> Iterator[TapeSummary]:
+    """ Assesses TapeStar files in a pool of worker processes.
+
+    Only the file paths are sent to the workers. The product, the expected
+    average and the other settings are sent once per worker. Every worker
+    loads, assesses and (optionally) renders the report of a tape itself
+    and only returns a small summary.
+
+    Args:
+        paths (Iterable[str]): Paths of the TapeStar files.
+        tape_specs (SpecReference): Product to assess the tapes against.
+        expected_average (float): Approximate average critical current.
+        save_pdf_to (str, optional): Directory to save the PDF reports to.
+            If None, no reports are rendered. Defaults to None.
+        processes (int, optional): Number of worker processes. If None, use
+            the number of CPUs. Defaults to None.
+        chunksize (int, optional): Number of files sent to a worker at
+            once. Defaults to 1.
+        maxtasksperchild (int, optional): Number of files after which a
+            worker is replaced by a fresh one. If None, workers live as long
+            as the pool. Defaults to None.
+        ordered (bool, optional): Yield summaries in the order of paths.
+            If False, yield them as soon as they are done. Defaults to True.
+        convert_to_meters (bool, optional): Convert postions from mm to
+            meters. If None, guess whether it's necessary. Defaults to None.
+        cache_dir (str, optional): Directory of the binary data cache (see
+            load_data). Defaults to None.
+        image_settings (PlotImageSettings, optional): Format and resolution
+            of the plots in the PDF reports. Defaults to None, i.e.
+            PlotImageSettings().
+
+    Raises:
+        ValueError: Raised if save_pdf_to is not a directory.
+
+    Returns:
+        Iterator[TapeSummary]: Summary of every assessed tape. The pool is
+            started on the first summary requested.
+    """
+    # checked here and not in the generator, which only runs on next()
+    if save_pdf_to is not None and not os.path.isdir(save_pdf_to):
+        raise ValueError(f"Directory {save_pdf_to} does not exist")
+
+    settings = _WorkerSettings(tape_specs, expected_average, save_pdf_to,
+                               convert_to_meters, cache_dir,
+                               image_settings=image_settings)
+    return _assess_in_pool(paths, settings, processes, chunksize,
+                           maxtasksperchild, ordered)
+
+
+def _assess_in_pool(paths: Iterable[str], settings: _WorkerSettings,
+                    processes: Optional[int], chunksize: int,
+                    maxtasksperchild: Optional[int],
+                    ordered: bool) -> Iterator[TapeSummary]:
+    with Pool(processes,
+              initializer=_init_worker,
+              initargs=(settings, ),
+              maxtasksperchild=maxtasksperchild) as pool:
+        imap = pool.imap if ordered else pool.imap_unordered
+        yield from imap(_assess_file, paths, chunksize)
+
+
+@dataclass
+class StageStatistics:
+    """ Timing statistics of one stage of a TapePipeline.
+
+    Attributes:
+    -----------
+        name (str): Name of the stage
+        workers (int): Number of worker processes
+        items (int): Number of processed tapes
+        busy_time (float): Summed processing time of all workers in s
+        idle_time (float): Summed time the workers waited for input in s
+        blocked_time (float): Summed time the workers waited for space in
+            the queue to the next stage in s
+        utilization (float, read only): Fraction of the time the workers
+            were busy
+    """
+    name: str
+    workers: int = 0
+    items: int = 0
+    busy_time: float = 0.0
+    idle_time: float = 0.0
+    blocked_time: float = 0.0
+
+    @property
+    def utilization(self) -> float:
+        total = self.busy_time + self.idle_time + self.blocked_time
+        return self.busy_time / total if total > 0.0 else 0.0
+
+
+class TapePipeline:
+    """ Assesses TapeStar files in three stages running at the same time:
+        loading, analysing and rendering the reports. Each stage has its
+        own pool of worker processes and is connected to the next stage by
+        a bounded queue, so that e.g. the report of one tape is rendered
+        while the next tape is analysed and the one after it is loaded.
+
+    Attributes:
+    -----------
+        tape_specs (SpecReference): Product to assess the tapes against.
+        expected_average (float): Approximate average critical current.
+        save_pdf_to (Optional[str]): Directory to save the PDF reports to.
+            If None, no reports are rendered.
+        workers (dict[str, int]): Number of worker processes per stage
+            ('load', 'analyse' and 'render').
+        queue_size (int): Maximum number of tapes waiting between two stages.
+        shared_memory (bool): Pass the traces between the stages in shared
+            memory instead of copying them through the queues.
+        image_settings (Optional[PlotImageSettings]): Format and resolution
+            of the plots in the PDF reports.
+        statistics (list[StageStatistics]): Timing statistics per stage of
+            the last run.
+    """
+    STAGES = ('load', 'analyse', 'render')
+
+    def __init__(self,
+                 tape_specs: SpecReference,
+                 expected_average: float,
+                 save_pdf_to: Optional[str] = None,
+                 load_workers: int = 1,
+                 analyse_workers: int = 1,
+                 render_workers: int = 1,
+                 queue_size: int = 2,
+                 convert_to_meters: Optional[bool] = None,
+                 cache_dir: Optional[str] = None,
+                 shared_memory: bool = False,
+                 image_settings: Optional[PlotImageSettings] = None) -> None:
+        if save_pdf_to is not None and not os.path.isdir(save_pdf_to):
+            raise ValueError(f"Directory {save_pdf_to} does not exist")
+        if min(load_workers, analyse_workers, render_workers, queue_size) < 1:
+            raise ValueError("Workers and queue size must be at least 1.")
+
+        self.tape_specs = tape_specs
+        self.expected_average = expected_average
+        self.save_pdf_to = save_pdf_to
+        self.workers = {'load': load_workers,
+                        'analyse': analyse_workers,
+                        'render': render_workers}
+        self.queue_size = queue_size
+        self.convert_to_meters = convert_to_meters
+        self.cache_dir = cache_dir
+        self.shared_memory = shared_memory
+        self.image_settings = image_settings
+        self.statistics: list[StageStatistics] = []
+
+    @property
+    def slowest_stage(self) -> Optional[StageStatistics]:
+        """ Stage with the longest processing time per worker in the last run.
+        """
+        if not self.statistics:
+            return None
+        return max(self.statistics,
+                   key=lambda stage: stage.busy_time / max(stage.workers, 1))
+
+    def run(self, paths: Iterable[str]) -> Iterator[TapeSummary]:
+        """ Runs all files through the pipeline.
+
+        Args:
+            paths (Iterable[str]): Paths of the TapeStar files.
+
+        Raises:
+            RuntimeError: Raised if a worker process died, e.g. was killed.
+                The tapes it was working on are lost.
+            Exception: Any exception raised while iterating paths is raised
+                after the tapes taken from paths before are done.
+
+        Yields:
+            TapeSummary: Summary of every assessed tape, in the order they
+                are done.
+        """
+        settings = _WorkerSettings(self.tape_specs, self.expected_average,
+                                   self.save_pdf_to, self.convert_to_meters,
+                                   self.cache_dir, self.shared_memory,
+                                   self.image_settings)
+        functions = {'load': _load_tape,
+                     'analyse': _analyse_tape,
+                     'render': _render_tape}
+        queues = [Queue(self.queue_size) for _ in range(len(self.STAGES) + 1)]
+        stats_queue: Queue = Queue()
+        if self.shared_memory:
+            # all workers have to share one resource tracker, otherwise the
+            # blocks are removed when the creating worker exits
+            resource_tracker.ensure_running()
+        stages = []
+        for i, name in enumerate(self.STAGES):
+            stages.append([
+                Process(target=_stage_worker,
+                        args=(name, functions[name], settings, queues[i],
+                              queues[i + 1], stats_queue),
+                        daemon=True) for _ in range(self.workers[name])
+            ])
+        for process in (process for stage in stages for process in stage):
+            process.start()
+
+        stop = Event()
+        feeder_errors: list[BaseException] = []
+        # names of the shared memory blocks of the tapes in the pipeline, the
+        # blocks left over if the run ends early are removed at the end
+        blocks: Optional[dict[str, list[str]]] = (
+            {} if self.shared_memory else None)
+        feeder = Thread(target=_feed_pipeline,
+                        args=(paths, queues, stages, stop, feeder_errors,
+                              blocks),
+                        daemon=True)
+        feeder.start()
+        try:
+            while (summary := _next_result(queues[-1], stages)) is not None:
+                if blocks is not None:
+                    # the block has been removed by the last stage using it
+                    names = blocks.get(summary.file_path)
+                    if names:
+                        names.pop(0)
+                yield summary
+            feeder.join()
+            _check_workers(stages)
+            if feeder_errors:
+                raise feeder_errors[0]
+            self.statistics = [StageStatistics(name) for name in self.STAGES]
+            for _ in range(sum(self.workers.values())):
+                worker = stats_queue.get()
+                stage = self.statistics[self.STAGES.index(worker.name)]
+                stage.workers += 1
+                stage.items += worker.items
+                stage.busy_time += worker.busy_time
+                stage.idle_time += worker.idle_time
+                stage.blocked_time += worker.blocked_time
+        finally:
+            stop.set()
+            for process in (process for stage in stages for process in stage):
+                if process.is_alive():
+                    process.terminate()
+                process.join()
+            feeder.join()
+            if blocks is not None:
+                for name in (name for names in blocks.values()
+                             for name in names):
+                    _unlink_block(name)
+
+
+def _next_result(queue: Queue,
+                 stages: list[list[Process]]) -> Optional[TapeSummary]:
+    # Waits for the next summary. Workers only end by themselves after the
+    # feeder told them to stop, which is only followed by the final None.
+    # Anything else means that a worker died and the pipeline would hang.
+    while True:
+        try:
+            return queue.get(timeout=_POLL_INTERVAL)
+        except Empty:
+            _check_workers(stages)
+
+
+def _unlink_block(name: str) -> None:
+    try:
+        shared = SharedTrace.attach(SharedTraceHandle(name, 0))
+    except FileNotFoundError:
+        return
+    shared.unlink()
+    shared.close()
+
+
+def _check_workers(stages: list[list[Process]]) -> None:
+    for process in (process for stage in stages for process in stage):
+        if process.exitcode not in (None, 0):
+            raise RuntimeError(f"Worker process {process.name} died with "
+                               f"exit code {process.exitcode}.")
+
+
+def _feed_pipeline(paths: Iterable[str], queues: list,
+                   stages: list[list[Process]], stop: Event,
+                   errors: list[BaseException],
+                   blocks: Optional[dict[str, list[str]]]) -> None:
+    try:
+        for path in paths:
+            # the name of the shared memory block is chosen here, so that
+            # the parent process knows every block the load stage creates
+            block_name = None
+            if blocks is not None:
+                block_name = f"qa_{uuid4().hex[:20]}"
+                blocks.setdefault(path, []).append(block_name)
+            if not _put(queues[0], (path, block_name), stop):
+                return
+    except Exception as error:
+        # handed to the consumer after the tapes fed so far are done
+        errors.append(error)
+
+    # stop each stage after the previous one has finished
+    for i, workers in enumerate(stages):
+        for _ in workers:
+            if not _put(queues[i], None, stop):
+                return
+        for process in workers:
+            while process.is_alive():
+                if stop.is_set():
+                    return
+                process.join(_POLL_INTERVAL)
+    _put(queues[-1], None, stop)
+
+
+def _put(queue: Queue, item: Any, stop: Event) -> bool:
+    # put that gives up when the pipeline is stopped, e.g. as the workers
+    # reading the queue died
+    while not stop.is_set():
+        try:
+            queue.put(item, timeout=_POLL_INTERVAL)
+            return True
+        except Full:
+            pass
+    return False
+
+
+def _stage_worker(name: str, function: Callable[[tuple, _WorkerSettings],
+                                                Any],
+                  settings: _WorkerSettings, in_queue: Queue,
+                  out_queue: Queue, stats_queue: Queue) -> None:
+    statistics = StageStatistics(name, workers=1)
+    while True:
+        start = perf_counter()
+        item = in_queue.get()
+        received = perf_counter()
+        statistics.idle_time += received - start
+        if item is None:
+            break
+
+        # summaries of failed tapes are passed on to the end
+        result = item
+        if not isinstance(item, TapeSummary):
+            try:
+                result = function(item, settings)
+            except Exception as error:
+                result = _failed_tape(item[0], settings, error)
+            statistics.items += 1
+        done = perf_counter()
+        statistics.busy_time += done - received
+
+        out_queue.put(result)
+        statistics.blocked_time += perf_counter() - done
+    stats_queue.put(statistics)
+
+
+def _init_worker(settings: _WorkerSettings) -> None:
+    global _worker_settings
+    _worker_settings = settings
+
+
+def _assess_file(path: str) -> TapeSummary:
+    settings = _worker_settings
+    assert settings is not None
+    try:
+        item = _load_tape((path, None), settings)
+        item = _analyse_tape(item, settings)
+        return _render_tape(item, settings)
+    except Exception as error:
+        # one broken file must not stop the whole batch
+        return _failed_tape(path, settings, error)
+
+
+def _resolve_specs(settings: _WorkerSettings) -> TapeSpecs:
+    if isinstance(settings.tape_specs, Enum):
+        return settings.tape_specs.value
+    return settings.tape_specs
+
+
+def _tape_id(path: str) -> str:
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+def _failed_tape(path: str, settings: _WorkerSettings,
+                 error: Exception) -> TapeSummary:
+    return TapeSummary(_tape_id(path), path,
+                       _resolve_specs(settings).description,
+                       error=repr(error))
+
+
+def _load_tape(item: tuple, settings: _WorkerSettings) -> tuple:
+    path, block_name = item
+    data = load_data(path, settings.convert_to_meters, settings.cache_dir)
+    trace = TapeTrace.from_data(data)
+    if not settings.shared_memory:
+        return path, trace
+
+    # the block stays until the last stage unlinks it
+    shared = SharedTrace.create(trace, block_name)
+    shared.close()
+    return path, shared.handle
+
+
+def _analyse_tape(item: tuple, settings: _WorkerSettings) -> tuple:
+    path, source = item
+    return (path, source) + _with_trace(source, _assess_trace, path, settings,
+                                        unlink=False)
+
+
+def _render_tape(item: tuple, settings: _WorkerSettings) -> TapeSummary:
+    path, source, quality_reports, ok_tape_sections = item
+    return _with_trace(source, _render_trace, path, quality_reports,
+                       ok_tape_sections, settings, unlink=True)
+
+
+def _with_trace(source: Union[TapeTrace, SharedTraceHandle],
+                function: Callable[..., Any], *args, unlink: bool) -> Any:
+    if not isinstance(source, SharedTraceHandle):
+        return function(source, *args)
+
+    shared = SharedTrace.attach(source)
+    try:
+        return function(shared.trace, *args)
+    except Exception as error:
+        # the traceback holds views on the shared memory
+        traceback.clear_frames(error.__traceback__)
+        unlink = True
+        raise
+    finally:
+        try:
+            shared.close()
+        except BufferError:
+            # views are still held by reference cycles, e.g. of the plot
+            gc.collect()
+            shared.close()
+        if unlink:
+            shared.unlink()
+
+
+def _assess_trace(trace: TapeTrace, path: str,
+                  settings: _WorkerSettings) -> tuple:
+    tape_specs = _resolve_specs(settings)
+    quality_info = TapeQualityInformation(trace, _tape_id(path),
+                                          settings.expected_average)
+    assessor = TapeQualityAssessor(quality_info, tape_specs)
+    assessor.assess_meets_specs()
+    assessor.determine_ok_tape_section(tape_specs.min_tape_length)
+    # only the results are sent on, the dropout_func of the specs might not
+    # be picklable
+    return assessor.quality_reports, assessor.ok_tape_sections
+
+
+def _render_trace(trace: TapeTrace, path: str,
+                  quality_reports: list[QualityReport],
+                  ok_tape_sections: list[TapeSection],
+                  settings: _WorkerSettings) -> TapeSummary:
+    quality_info = TapeQualityInformation(trace, _tape_id(path),
+                                          settings.expected_average)
+    assessor = TapeQualityAssessor(quality_info, _resolve_specs(settings))
+    assessor.quality_reports = quality_reports
+    assessor.ok_tape_sections = ok_tape_sections
+
+    report_path = None
+    if settings.save_pdf_to is not None:
+        assessor.save_pdf_report(settings.save_pdf_to,
+                                 image_settings=settings.image_settings)
+        report_path = os.path.join(settings.save_pdf_to,
+                                   f"Report {quality_info.tape_id}.pdf")
+    return TapeSummary.from_assessor(assessor, path, report_path)
@@ -1,8 +1,11 @@
 """ provides data types for analysing defect structures in HTS tapes
 """
-from typing import Optional, Protocol, Callable, runtime_checkable
+from typing import (Optional, Protocol, Callable, Iterable, Iterator,
+                    Sequence, runtime_checkable)
 from dataclasses import dataclass
 from enum import Enum
+import numpy as np
+from numpy.typing import ArrayLike, NDArray
 
 
 @runtime_checkable
@@ -32,6 +35,9 @@ class PeakInfo:
     """ Class holding information about individual peaks.
         Conforms to QualityParameterInfo protocol
     """
+    __slots__ = ('p_id', 'start_position', 'end_position', 'center_position',
+                 'value')
+
     @property
     def width(self):
         return self.end_position - self.start_position
@@ -58,6 +64,8 @@ class AveragesInfo:
     """ Class holding information about piecewise averages.
         Conforms to QualityParameterInfo protocol
     """
+    __slots__ = ('p_id', 'start_position', 'end_position', 'value')
+
     @property
     def center_position(self):
         return (self.start_position + self.end_position) / 2.0
@@ -86,6 +94,8 @@ class ScatterInfo:
     """ Class holding information about piecewise scatter characteristics.
         Conforms to QualityParameterInfo protocol
     """
+    __slots__ = ('p_id', 'start_position', 'end_position', 'value')
+
     @property
     def center_position(self):
         return (self.start_position + self.end_position) / 2.0
@@ -110,6 +120,135 @@ class ScatterInfo:
         self.value = value
 
 
+class QualityParameterArray:
+    """ Columnar container holding a whole set of quality parameter
+        information of one type (e.g. all drop-outs of a tape) in arrays.
+        Iterating or indexing with an int yields info_type instances, which
+        conform to the QualityParameterInfo protocol. Indexing with a slice,
+        a mask or an index array yields a QualityParameterArray.
+
+    Attributes:
+    -----------
+        info_type (type): PeakInfo, AveragesInfo or ScatterInfo
+        p_id (NDArray[np.intp]): IDs
+        start_position (NDArray): Start positions
+        end_position (NDArray): End positions
+        center_position (NDArray): Center positions
+        value (NDArray): Values
+        width (NDArray, read only): Widths
+    """
+    __slots__ = ('info_type', 'p_id', 'start_position', 'end_position',
+                 'center_position', 'value')
+
+    @property
+    def width(self) -> NDArray[np.float64]:
+        return self.end_position - self.start_position
+
+    def __init__(self,
+                 info_type: type,
+                 p_id: ArrayLike = (),
+                 start_position: ArrayLike = (),
+                 end_position: ArrayLike = (),
+                 value: ArrayLike = (),
+                 center_position: Optional[ArrayLike] = None) -> None:
+        self.info_type = info_type
+        self.p_id = np.asarray(p_id, dtype=np.intp)
+        self.start_position = np.asarray(start_position, dtype=np.float64)
+        self.end_position = np.asarray(end_position, dtype=np.float64)
+        self.value = np.asarray(value, dtype=np.float64)
+        if center_position is None:
+            self.center_position = (self.start_position +
+                                    self.end_position) / 2.0
+        else:
+            self.center_position = np.asarray(center_position,
+                                              dtype=np.float64)
+
+    @classmethod
+    def from_infos(cls, info_type: type,
+                   infos: Iterable[QualityParameterInfo]
+                   ) -> 'QualityParameterArray':
+        """ Creates a container from individual information objects.
+
+        Args:
+            info_type (type): Type of the information objects.
+            infos (Iterable[QualityParameterInfo]): Information objects.
+
+        Returns:
+            QualityParameterArray: Container holding the information.
+        """
+        infos = list(infos)
+        return cls(info_type,
+                   p_id=[info.p_id for info in infos],
+                   start_position=[info.start_position for info in infos],
+                   end_position=[info.end_position for info in infos],
+                   value=[info.value for info in infos],
+                   center_position=[info.center_position for info in infos])
+
+    def __len__(self) -> int:
+        return self.p_id.size
+
+    def __getitem__(self, index):
+        if isinstance(index, (int, np.integer)):
+            return self._make_info(int(self.p_id[index]),
+                                   float(self.start_position[index]),
+                                   float(self.end_position[index]),
+                                   float(self.center_position[index]),
+                                   float(self.value[index]))
+        return QualityParameterArray(self.info_type,
+                                     p_id=self.p_id[index],
+                                     start_position=self.start_position[index],
+                                     end_position=self.end_position[index],
+                                     value=self.value[index],
+                                     center_position=self.center_position[index])
+
+    def __iter__(self) -> Iterator[QualityParameterInfo]:
+        for p_id, start, end, center, value in zip(
+                self.p_id.tolist(), self.start_position.tolist(),
+                self.end_position.tolist(), self.center_position.tolist(),
+                self.value.tolist()):
+            yield self._make_info(p_id, start, end, center, value)
+
+    def locate(self, positions: ArrayLike) -> NDArray[np.intp]:
+        """ Finds the entries whose range strictly contains the positions
+            (start_position < position < end_position). The entries must be
+            sorted by position and must not overlap, as piecewise statistics
+            are.
+
+        Args:
+            positions (ArrayLike): Positions to look up.
+
+        Returns:
+            NDArray[np.intp]: Index of the containing entry for every
+                position, -1 if no entry contains it.
+        """
+        positions = np.asarray(positions, dtype=np.float64)
+        # last entry starting before the position is the only candidate
+        indices = np.searchsorted(self.start_position, positions,
+                                  side='left') - 1
+        inside = indices >= 0
+        inside[inside] = (positions[inside] <
+                          self.end_position[indices[inside]])
+        indices[~inside] = -1
+        return indices
+
+    def __repr__(self) -> str:
+        return (f"QualityParameterArray({self.info_type.__name__}, "
+                f"{len(self)} entries)")
+
+    def _make_info(self, p_id: int, start: float, end: float, center: float,
+                   value: float) -> QualityParameterInfo:
+        if 'center_position' in self.info_type.__slots__:
+            return self.info_type(p_id=p_id,
+                                  start_position=start,
+                                  end_position=end,
+                                  center_position=center,
+                                  value=value)
+        return self.info_type(p_id=p_id,
+                              start_position=start,
+                              end_position=end,
+                              value=value)
+
+
 @dataclass
 class TapeSpecs:
     """ Tuple holding information about tape specifications
@@ -124,6 +263,9 @@ class TapeSpecs:
         min_average (Optional[float]): Minimum average value in A
         average_length (Optional[float]): Length over which to average in m
         description (str): Name/Description of the product
+        averaging_step (Optional[float]): If set, averages are calculated
+            over a window of averaging_length moved along the tape in steps of
+            averaging_step in m instead of over consecutive pieces
     """
     width: float
     min_tape_length: float
@@ -134,6 +276,7 @@ class TapeSpecs:
     min_average: Optional[float]
     averaging_length: Optional[float]
     description: str
+    averaging_step: Optional[float] = None
 
 
 class TestType(Enum):
@@ -172,12 +315,12 @@ class QualityReport:
     -----------
         tape_id (str): ID of the tested tape.
         test_type (TestType): Type of the test.
-        fail_information (Optional[list[QualityParameterInfo]]): Information about failures
+        fail_information (Optional[Sequence[QualityParameterInfo]]): Information about failures
         passed (bool): Test passed or not.
     """
     tape_id: str
     test_type: TestType
-    fail_information: Optional[list[QualityParameterInfo]] = None
+    fail_information: Optional[Sequence[QualityParameterInfo]] = None
 
     @property
     def passed(self) -> bool:
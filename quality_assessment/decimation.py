@@ -0,0 +1,80 @@
+""" Peak-preserving decimation of tape traces for plotting
+"""
+from typing import Optional
+import numpy as np
+from numpy.typing import ArrayLike, NDArray
+
+# number of buckets used for plots, about the horizontal resolution of a
+# report figure rasterised for the PDF
+PLOT_BUCKETS = 2000
+
+
+def min_max_indices(values: NDArray[np.float64], buckets: int,
+                    keep_indices: Optional[ArrayLike] = None
+                    ) -> NDArray[np.intp]:
+    """ Selects the samples needed to draw a trace that looks the same as the
+        full trace at a horizontal resolution of the given number of buckets.
+
+    The samples are split into buckets of consecutive samples and the
+    minimum and maximum of each bucket are kept, together with the first and
+    last sample. So every dip is drawn to its full depth, a drop-out can
+    only merge with its neighbours within one bucket. Samples in
+    keep_indices, e.g. the peaks of drop-outs, are always kept.
+
+    Args:
+        values (NDArray): Values of the trace.
+        buckets (int): Number of buckets.
+        keep_indices (ArrayLike, optional): Indices that are always kept.
+            Defaults to None.
+
+    Raises:
+        ValueError: Raised if buckets is not positive.
+
+    Returns:
+        NDArray[np.intp]: Ascending indices of the selected samples.
+    """
+    if buckets < 1:
+        raise ValueError("Number of buckets must be positive.")
+    size = values.size
+    if size <= 2 * buckets:
+        return np.arange(size)
+
+    # equal buckets of consecutive samples, the last one padded so that the
+    # padding is never selected
+    length = -(-size // buckets)
+    count = -(-size // length)
+    padding = count * length - size
+    starts = np.arange(count) * length
+    minima = np.pad(values, (0, padding),
+                    constant_values=np.inf).reshape(count, length).argmin(1)
+    maxima = np.pad(values, (0, padding),
+                    constant_values=-np.inf).reshape(count, length).argmax(1)
+
+    indices = [starts + minima, starts + maxima, [0, size - 1]]
+    if keep_indices is not None:
+        indices.append(np.asarray(keep_indices, dtype=np.intp))
+    return np.unique(np.concatenate(indices))
+
+
+def bucket_minima(values: NDArray[np.float64],
+                  buckets: int) -> NDArray[np.float64]:
+    """ Reduces a trace to the minimum of each of a number of buckets of
+        consecutive samples, e.g. for a sparkline showing every drop-out.
+
+    Args:
+        values (NDArray): Values of the trace.
+        buckets (int): Number of buckets.
+
+    Raises:
+        ValueError: Raised if buckets is not positive.
+
+    Returns:
+        NDArray: Minimum of each bucket, or all values if there are not more
+            values than buckets.
+    """
+    if buckets < 1:
+        raise ValueError("Number of buckets must be positive.")
+    if values.size <= buckets:
+        return values.copy()
+    starts = np.linspace(0, values.size, buckets + 1).astype(np.intp)[:-1]
+    return np.minimum.reduceat(values, starts)
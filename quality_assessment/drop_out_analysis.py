@@ -0,0 +1,221 @@
+""" Vectorized functions for analysing drop-outs of HTS tapes
+"""
+from bisect import bisect_left, bisect_right
+from math import isclose
+import numpy as np
+from numpy.typing import NDArray
+
+# minimum number of samples between two peaks found by find_peaks
+PEAK_DISTANCE = 10
+
+_INITIAL_WINDOW = 8
+_MAX_WINDOW = 4096
+
+# relative tolerance used by math.isclose
+_REL_TOL = 1e-9
+
+
+def select_by_peak_distance(peak_indices: NDArray[np.intp],
+                            peak_values: NDArray[np.float64],
+                            distance: int = PEAK_DISTANCE
+                            ) -> NDArray[np.bool_]:
+    """ Selects drop-out peaks like the distance criterion of find_peaks:
+        starting with the lowest peak, all peaks closer than distance samples
+        to a selected peak are removed. Of equally low peaks, the first one
+        is selected first.
+
+    Peaks only affect each other within a chain of peaks that are closer
+    than distance to their neighbours, however long it is, so each chain
+    can be selected on its own once a gap of at least distance follows it.
+
+    Args:
+        peak_indices (NDArray[np.intp]): Ascending indices of the peaks,
+            e.g. from find_peaks without distance.
+        peak_values (NDArray): Values of the peaks.
+        distance (int, optional): Minimum number of samples between two
+            selected peaks. Defaults to PEAK_DISTANCE.
+
+    Returns:
+        NDArray[np.bool_]: Mask of the selected peaks.
+    """
+    keep = np.ones(peak_indices.size, dtype=bool)
+    close = np.flatnonzero(np.diff(peak_indices) < distance)
+    if close.size == 0:
+        return keep
+
+    # peaks without a neighbour closer than distance are always selected,
+    # the others are handled by priority like find_peaks does
+    chained = np.unique(np.concatenate((close, close + 1)))
+    order = chained[np.lexsort((peak_indices[chained],
+                                peak_values[chained]))]
+    indices = peak_indices.tolist()
+    for i in order.tolist():
+        if keep[i]:
+            keep[bisect_right(indices, indices[i] - distance):i] = False
+            keep[i + 1:bisect_left(indices, indices[i] + distance)] = False
+    return keep
+
+
+def half_max_positions(
+        positions: NDArray[np.float64], values: NDArray[np.float64],
+        peak_indices: NDArray[np.intp], half_max: NDArray[np.float64]
+) -> tuple[NDArray[np.float64], NDArray[np.float64]]:
+    """ Finds the positions left and right of all peaks at which the values
+        cross the peaks' half-max levels.
+
+    Starting from each peak, the first sample above its half-max level is
+    searched for in both directions and the crossing position is linearly
+    interpolated between that sample and its predecessor. If no crossing is
+    found, the first or last position of the data is used, respectively.
+
+    Args:
+        positions (NDArray): Ascending positions of the tape.
+        values (NDArray): Values of the tape.
+        peak_indices (NDArray[np.intp]): Indices of the peaks.
+        half_max (NDArray): Half-max level of each peak.
+
+    Returns:
+        tuple[NDArray, NDArray]: Start and end positions of the peaks.
+    """
+    start_positions = _crossing_positions(positions, values, peak_indices,
+                                          half_max, -1)
+    end_positions = _crossing_positions(positions, values, peak_indices,
+                                        half_max, 1)
+    return start_positions, end_positions
+
+
+def _crossing_positions(positions: NDArray[np.float64],
+                        values: NDArray[np.float64],
+                        peak_indices: NDArray[np.intp],
+                        half_max: NDArray[np.float64],
+                        step: int) -> NDArray[np.float64]:
+    last_index = values.size - 1 if step > 0 else 0
+    crossings = _first_above(values, peak_indices, half_max, step, last_index)
+
+    result = np.full(peak_indices.size, positions[last_index])
+    found = crossings >= 0
+    above = crossings[found]
+    below = above - step
+    slope = ((positions[above] - positions[below]) /
+             (values[above] - values[below]))
+    result[found] = (slope * (half_max[found] - values[below]) +
+                     positions[below])
+
+    return result
+
+
+def _first_above(values: NDArray[np.float64], start_indices: NDArray[np.intp],
+                 levels: NDArray[np.float64], step: int,
+                 last_index: int) -> NDArray[np.intp]:
+    # Walk away from all peaks at once in growing windows. Peaks whose
+    # crossing has been found drop out of the active set, so the total work
+    # is proportional to the summed peak widths.
+    crossings = np.full(start_indices.size, -1, dtype=np.intp)
+    active = np.arange(start_indices.size)
+    offset = 0
+    window = _INITIAL_WINDOW
+
+    while active.size > 0:
+        candidates = (start_indices[active, None] +
+                      step * (offset + np.arange(window)))
+        if step > 0:
+            inside = candidates < last_index
+        else:
+            inside = candidates > last_index
+        candidate_values = values[np.clip(candidates, 0, values.size - 1)]
+        hits = inside & (candidate_values > levels[active, None])
+
+        found = hits.any(axis=1)
+        first_hit = hits.argmax(axis=1)
+        crossings[active[found]] = candidates[found, first_hit[found]]
+
+        active = active[~found & inside[:, -1]]
+        offset += window
+        window = min(2 * window, _MAX_WINDOW)
+
+    return crossings
+
+
+def merge_duplicate_peaks(
+        start_positions: NDArray[np.float64],
+        end_positions: NDArray[np.float64],
+        values: NDArray[np.float64],
+        pos_tol: float,
+        last_peak: tuple[float, float, float] = (0.0, 0.0, 0.0)
+) -> tuple[int, NDArray[np.intp]]:
+    """ Merges consecutive peaks whose start and end positions are the same
+        within a tolerance, keeping the lowest peak of each group.
+
+    The peaks are handled as if one after the other: a peak is compared with
+    the kept peak of the current group. If both edges are close (math.isclose
+    with abs_tol=pos_tol), it replaces the kept peak if its value is smaller,
+    otherwise it is dropped. If not, it starts a new group.
+
+    Args:
+        start_positions (NDArray): Start positions of the peaks.
+        end_positions (NDArray): End positions of the peaks.
+        values (NDArray): Values of the peaks.
+        pos_tol (float): Tolerance for positions to be identified as the same.
+        last_peak (tuple[float, float, float], optional): Start, end and value
+            of the kept peak preceding the given peaks.
+            Defaults to (0.0, 0.0, 0.0).
+
+    Returns:
+        tuple[int, NDArray[np.intp]]: Index of the peak replacing last_peak
+            (-1 if last_peak is kept) and indices of the peaks kept for all
+            following groups.
+    """
+    starts = np.concatenate(([last_peak[0]], start_positions))
+    ends = np.concatenate(([last_peak[1]], end_positions))
+    values = np.concatenate(([last_peak[2]], values))
+
+    # The kept peak of a group is within the tolerance of every other member,
+    # i.e. also of the previous peak. A peak more than twice the tolerance
+    # away from its predecessor therefore always starts a new group (with
+    # some margin against rounding).
+    largest = np.nanmax(np.abs(np.concatenate((starts, ends))), initial=0.0)
+    tol = max(pos_tol, _REL_TOL * largest)
+    breaks = ((np.abs(np.diff(starts)) > 3.0 * tol) |
+              (np.abs(np.diff(ends)) > 3.0 * tol))
+    segments = np.concatenate(([0], np.flatnonzero(breaks) + 1))
+    lengths = np.diff(np.append(segments, starts.size))
+
+    # In segments whose edges all lie within the tolerance, every peak is
+    # close to every other one, so the first lowest peak is kept.
+    spread = np.maximum(
+        np.maximum.reduceat(starts, segments) -
+        np.minimum.reduceat(starts, segments),
+        np.maximum.reduceat(ends, segments) -
+        np.minimum.reduceat(ends, segments))
+    minima = np.minimum.reduceat(values, segments)
+    regular = (spread <= pos_tol) & ~np.isnan(minima)
+    lowest = np.flatnonzero(values == np.repeat(minima, lengths))
+
+    kept = np.zeros(starts.size, dtype=bool)
+    kept[lowest[np.searchsorted(lowest, segments[regular])]] = True
+    if not regular.all():
+        _merge_sequentially(starts.tolist(), ends.tolist(), values.tolist(),
+                            pos_tol, segments[~regular].tolist(),
+                            lengths[~regular].tolist(), kept)
+
+    indices = np.flatnonzero(kept) - 1
+    return int(indices[0]), indices[1:]
+
+
+def _merge_sequentially(starts: list[float], ends: list[float],
+                        values: list[float], pos_tol: float,
+                        segments: list[int], lengths: list[int],
+                        kept: NDArray[np.bool_]) -> None:
+    for first, length in zip(segments, lengths):
+        current = first
+        kept[current] = True
+        for i in range(first + 1, first + length):
+            if (isclose(starts[i], starts[current], abs_tol=pos_tol)
+                    and isclose(ends[i], ends[current], abs_tol=pos_tol)):
+                if values[i] < values[current]:
+                    kept[current] = False
+                    kept[i] = True
+                    current = i
+            else:
+                kept[i] = True
+                current = i
@@ -1,11 +1,17 @@
 """ Helper functions for TapeStar quality assessment.
 """
-from typing import Optional
+import os
+import json
+import hashlib
+from typing import Iterator, Optional
+import numpy as np
+from numpy.typing import NDArray
 from pandas import DataFrame, read_csv
 
 
 def load_data(from_path: str,
-              convert_to_meters: Optional[bool] = False) -> DataFrame:
+              convert_to_meters: Optional[bool] = False,
+              cache_dir: Optional[str] = None) -> DataFrame:
     """ Loads csv-data from TapeStar Ic-exports.
 
     Args:
@@ -13,10 +19,21 @@ def load_data(from_path: str,
         convert_to_meters (bool, optional): Convert postions from mm to
             meters. If None, guess whether it's necessary to convert.
             Defaults to False.
+        cache_dir (str, optional): Directory of a binary cache. If set, the
+            parsed position and current columns are stored there as one
+            file each and memory-mapped on later loads as long as the
+            csv-file is unchanged. The returned DataFrame then only holds
+            these two (read-only) columns, which TapeQualityInformation uses
+            without copying. Defaults to None (no cache).
 
     Returns:
         DataFrame: Ic-data from TapeStar csv-file
     """
+    if cache_dir is not None:
+        data = _load_cached_data(from_path, convert_to_meters, cache_dir)
+        if data is not None:
+            return data
+
     data = read_csv(from_path, header=1, delimiter="\t")
 
     convert = convert_to_meters
@@ -27,5 +44,120 @@ def load_data(from_path: str,
         convert = data.iloc[:, 0].size/length < 10
 
     if convert:
-        data.iloc[:, 0] = data.iloc[:, 0].div(1000.0)
+        data[data.columns[0]] = data.iloc[:, 0].div(1000.0)
+
+    if cache_dir is not None:
+        data = _store_cached_data(data, from_path, convert_to_meters,
+                                  cache_dir)
     return data
+
+
+def load_data_chunks(
+        from_path: str,
+        chunk_size: int = 1_000_000,
+        convert_to_meters: Optional[bool] = False
+) -> Iterator[tuple[NDArray[np.float64], NDArray[np.float64]]]:
+    """ Loads csv-data from TapeStar Ic-exports in chunks of fixed size, so
+        that memory use is bounded by the chunk size.
+
+    Args:
+        from_path (str): Path of csv-file to be loaded
+        chunk_size (int, optional): Number of rows per chunk.
+            Defaults to 1_000_000.
+        convert_to_meters (bool, optional): Convert postions from mm to
+            meters. If None, guess from the first chunk whether it's
+            necessary to convert. Defaults to False.
+
+    Yields:
+        tuple[NDArray, NDArray]: Positions and critical currents of a chunk.
+    """
+    convert = convert_to_meters
+    with read_csv(from_path, header=1, delimiter="\t",
+                  chunksize=chunk_size) as reader:
+        for chunk in reader:
+            positions = chunk.iloc[:, 0].to_numpy(dtype=np.float64)
+
+            # convert to meters if number of data points is close to length
+            if convert is None:
+                length = abs(positions[-1] - positions[0])
+                convert = positions.size/length < 10
+
+            if convert:
+                positions = positions / 1000.0
+            yield positions, chunk.iloc[:, 1].to_numpy(dtype=np.float64)
+
+
+def _cache_paths(from_path: str, convert_to_meters: Optional[bool],
+                 cache_dir: str) -> tuple[list[str], str]:
+    key = f"{os.path.abspath(from_path)}|{convert_to_meters}"
+    name = hashlib.sha1(key.encode('utf8')).hexdigest()
+    base = os.path.join(cache_dir, name)
+    return [f"{base}.positions.npy", f"{base}.values.npy"], f"{base}.json"
+
+
+def _file_hash(from_path: str) -> str:
+    digest = hashlib.sha256()
+    with open(from_path, 'rb') as file:
+        for block in iter(lambda: file.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _load_cached_data(from_path: str, convert_to_meters: Optional[bool],
+                      cache_dir: str) -> Optional[DataFrame]:
+    array_paths, meta_path = _cache_paths(from_path, convert_to_meters,
+                                          cache_dir)
+    if not all(os.path.isfile(path) for path in [*array_paths, meta_path]):
+        return None
+
+    with open(meta_path, encoding='utf8') as file:
+        meta = json.load(file)
+    stat = os.stat(from_path)
+    if stat.st_size != meta['size']:
+        return None
+
+    # a changed modification time alone does not invalidate the cache if
+    # the content is still the same
+    if stat.st_mtime_ns != meta['mtime_ns']:
+        if _file_hash(from_path) != meta['sha256']:
+            return None
+        meta['mtime_ns'] = stat.st_mtime_ns
+        _write_json(meta, meta_path)
+
+    # one contiguous memory map per column
+    columns = [np.load(path, mmap_mode='r') for path in array_paths]
+    return DataFrame(dict(zip(meta['columns'], columns)), copy=False)
+
+
+def _store_cached_data(data: DataFrame, from_path: str,
+                       convert_to_meters: Optional[bool],
+                       cache_dir: str) -> DataFrame:
+    os.makedirs(cache_dir, exist_ok=True)
+    array_paths, meta_path = _cache_paths(from_path, convert_to_meters,
+                                          cache_dir)
+    if os.path.isfile(meta_path):
+        os.remove(meta_path)
+    stat = os.stat(from_path)
+    columns = [data.iloc[:, 0].to_numpy(dtype=np.float64),
+               data.iloc[:, 1].to_numpy(dtype=np.float64)]
+
+    for column, array_path in zip(columns, array_paths):
+        temp_path = f"{array_path}.{os.getpid()}.tmp"
+        with open(temp_path, 'wb') as file:
+            np.save(file, column)
+        os.replace(temp_path, array_path)
+    _write_json({'source': os.path.abspath(from_path),
+                 'size': stat.st_size,
+                 'mtime_ns': stat.st_mtime_ns,
+                 'sha256': _file_hash(from_path),
+                 'columns': [str(name) for name in data.columns[:2]]},
+                meta_path)
+
+    return DataFrame(dict(zip(data.columns[:2], columns)), copy=False)
+
+
+def _write_json(content: dict, to_path: str) -> None:
+    temp_path = f"{to_path}.{os.getpid()}.tmp"
+    with open(temp_path, 'w', encoding='utf8') as file:
+        json.dump(content, file)
+    os.replace(temp_path, to_path)
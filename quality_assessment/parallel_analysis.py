@@ -0,0 +1,110 @@
+""" Analysis of one long tape split into segments that are processed in
+    parallel
+"""
+from concurrent.futures import Executor
+from dataclasses import fields
+import numpy as np
+from numpy.typing import NDArray
+from scipy.signal import find_peaks
+from .drop_out_analysis import half_max_positions
+from .piecewise_statistics import PieceStatistics, piecewise_statistics
+
+
+def parallel_piecewise_statistics(positions: NDArray[np.float64],
+                                  values: NDArray[np.float64],
+                                  bounds: NDArray[np.intp],
+                                  executor: Executor,
+                                  segments: int) -> PieceStatistics:
+    """ Calculates piecewise statistics of groups of consecutive pieces in
+        parallel and joins them. The result is the same as calculating all
+        pieces at once.
+
+    Args:
+        positions (NDArray): Ascending positions of the tape.
+        values (NDArray): Values of the tape.
+        bounds (NDArray[np.intp]): Piece boundaries (see piece_boundaries).
+        executor (Executor): Executor running the groups.
+        segments (int): Number of groups of about the same number of samples.
+
+    Returns:
+        PieceStatistics: Statistics of all pieces.
+    """
+    # split between pieces, so that no piece is cut
+    targets = np.linspace(bounds[0], bounds[-1], segments + 1)[1:-1]
+    splits = np.unique(np.concatenate(
+        ([0], np.searchsorted(bounds, targets), [bounds.size - 1])))
+    parts = list(executor.map(
+        lambda first, last: piecewise_statistics(positions, values,
+                                                 bounds[first:last + 1]),
+        splits[:-1], splits[1:]))
+
+    return PieceStatistics(
+        *(np.concatenate([getattr(part, field.name) for part in parts])
+          for field in fields(PieceStatistics)))
+
+
+def parallel_peak_candidates(values: NDArray[np.float64], start_index: int,
+                             end_index: int, threshold: float,
+                             executor: Executor,
+                             segments: int) -> NDArray[np.intp]:
+    """ Finds the candidates of drop-out peaks (minima between 0 and
+        threshold, find_peaks without distance) in parallel segments. Apply
+        select_by_peak_distance to the candidates to get the drop-out peaks.
+
+    The segments are split at samples of the tape above the threshold. As
+    such a sample can't be part of a candidate (or its plateau), searching
+    each segment including the samples at both seams finds exactly the
+    candidates of a search of the whole data.
+
+    Args:
+        values (NDArray): Values of the tape.
+        start_index (int): Index of the start of the tape.
+        end_index (int): Index of the end of the tape.
+        threshold (float): Maximum value of a drop-out peak.
+        executor (Executor): Executor running the segments.
+        segments (int): Number of segments.
+
+    Returns:
+        NDArray[np.intp]: Ascending indices of the candidates.
+    """
+    above = np.flatnonzero(values[start_index:end_index + 1] > threshold)
+    above += start_index
+    targets = np.linspace(start_index, end_index, segments + 1)[1:-1]
+    seams = np.unique(np.concatenate((
+        [0], above[np.minimum(np.searchsorted(above, targets),
+                              above.size - 1)], [values.size - 1])))
+
+    def search(first: int, last: int) -> NDArray[np.intp]:
+        indices, _ = find_peaks(-values[first:last + 1],
+                                height=(-threshold, 0))
+        return indices + first
+
+    return np.concatenate(list(executor.map(search, seams[:-1], seams[1:])))
+
+
+def parallel_half_max_positions(
+        positions: NDArray[np.float64], values: NDArray[np.float64],
+        peak_indices: NDArray[np.intp], half_max: NDArray[np.float64],
+        executor: Executor,
+        segments: int) -> tuple[NDArray[np.float64], NDArray[np.float64]]:
+    """ Runs half_max_positions for groups of peaks in parallel.
+
+    Args:
+        positions (NDArray): Ascending positions of the tape.
+        values (NDArray): Values of the tape.
+        peak_indices (NDArray[np.intp]): Indices of the peaks.
+        half_max (NDArray): Half-max level of each peak.
+        executor (Executor): Executor running the groups.
+        segments (int): Number of groups.
+
+    Returns:
+        tuple[NDArray, NDArray]: Start and end positions of the peaks.
+    """
+    groups = np.array_split(np.arange(peak_indices.size), segments)
+    parts = list(executor.map(
+        lambda group: half_max_positions(positions, values,
+                                         peak_indices[group],
+                                         half_max[group]), groups))
+
+    return (np.concatenate([part[0] for part in parts]),
+            np.concatenate([part[1] for part in parts]))
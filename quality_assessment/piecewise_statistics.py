@@ -0,0 +1,209 @@
+""" Vectorized calculation of piecewise statistics along HTS tapes
+"""
+from typing import Optional
+from dataclasses import dataclass
+import numpy as np
+from numpy.typing import NDArray
+
+
+def piece_boundaries(positions: NDArray[np.float64], start_index: int,
+                     end_index: int,
+                     piece_length: Optional[float]) -> NDArray[np.intp]:
+    """ Determines the indices of all piece boundaries in one pass.
+
+    Piece k covers the samples from bounds[k] up to (excluding) bounds[k+1].
+    A new piece starts at the first sample beyond a multiple of the piece
+    length measured from the start position. The last piece is cut off at
+    the end index.
+
+    Args:
+        positions (NDArray): Ascending positions of the tape.
+        start_index (int): Index of the start of the tape.
+        end_index (int): Index of the end of the tape.
+        piece_length (float, optional): piece length over which to
+            calculate the parameter. If None, use the whole length.
+
+    Returns:
+        NDArray[np.intp]: Boundary indices, starting with start_index and
+            ending with end_index.
+    """
+    start_position = positions[start_index]
+    end_position = positions[end_index]
+    length = piece_length
+    if piece_length is None or piece_length == 0.0:
+        length = end_position - start_position
+
+    thresholds = np.empty(0)
+    if length > 0.0:
+        # accumulate piece lengths the same way as stepping piece by piece
+        count = int((end_position - start_position) / length) + 2
+        steps = np.full(count + 1, length)
+        steps[0] = start_position
+        thresholds = np.add.accumulate(steps)[1:]
+        thresholds = thresholds[:np.searchsorted(thresholds, end_position)]
+
+    next_indices = np.searchsorted(positions, thresholds, side='right')
+
+    return np.concatenate(([start_index], next_indices, [end_index])).astype(
+        np.intp)
+
+
+@dataclass
+class PieceStatistics:
+    """ Statistics of all pieces of a tape.
+
+    Attributes:
+    -----------
+        start_positions (NDArray): Position of the first sample of each piece.
+        end_positions (NDArray): Position of the sample following each piece.
+        count (NDArray): Number of valid (not NaN) values per piece.
+        mean (NDArray): Mean value per piece (NaN for empty pieces).
+        std (NDArray): Sample standard deviation per piece (NaN for less than
+            two values).
+        minimum (NDArray): Minimum value per piece (NaN for empty pieces).
+        maximum (NDArray): Maximum value per piece (NaN for empty pieces).
+    """
+    start_positions: NDArray[np.float64]
+    end_positions: NDArray[np.float64]
+    count: NDArray[np.intp]
+    mean: NDArray[np.float64]
+    std: NDArray[np.float64]
+    minimum: NDArray[np.float64]
+    maximum: NDArray[np.float64]
+
+
+def piecewise_statistics(positions: NDArray[np.float64],
+                         values: NDArray[np.float64],
+                         bounds: NDArray[np.intp]) -> PieceStatistics:
+    """ Calculates count, mean, standard deviation, minimum and maximum of
+        every piece in one pass. NaN values are skipped.
+
+    The first value of each piece is subtracted before the moments are
+    accumulated (shifted data algorithm), which keeps the variance
+    numerically stable for large values with small scatter.
+
+    Args:
+        positions (NDArray): Ascending positions of the tape.
+        values (NDArray): Values of the tape.
+        bounds (NDArray[np.intp]): Piece boundaries (see piece_boundaries).
+
+    Returns:
+        PieceStatistics: Statistics of all pieces.
+    """
+    lengths = np.diff(bounds)
+    segment = values[bounds[0]:bounds[-1]]
+    filled = lengths > 0
+    offsets = bounds[:-1][filled] - bounds[0]
+
+    finite = ~np.isnan(segment)
+    shifts = np.zeros(lengths.size)
+    shifts[filled] = np.nan_to_num(segment[offsets])
+    shifted = np.where(finite, segment - np.repeat(shifts, lengths), 0.0)
+
+    count = np.zeros(lengths.size, dtype=np.intp)
+    sums = np.zeros(lengths.size)
+    squares = np.zeros(lengths.size)
+    minimum = np.full(lengths.size, np.nan)
+    maximum = np.full(lengths.size, np.nan)
+    if offsets.size > 0:
+        count[filled] = np.add.reduceat(finite.astype(np.intp), offsets)
+        sums[filled] = np.add.reduceat(shifted, offsets)
+        squares[filled] = np.add.reduceat(shifted * shifted, offsets)
+        minimum[filled] = np.fmin.reduceat(segment, offsets)
+        maximum[filled] = np.fmax.reduceat(segment, offsets)
+
+    mean, std = _mean_std(shifts, count, sums, squares)
+
+    return PieceStatistics(start_positions=positions[bounds[:-1]],
+                           end_positions=positions[bounds[1:]],
+                           count=count,
+                           mean=mean,
+                           std=std,
+                           minimum=minimum,
+                           maximum=maximum)
+
+
+def moving_statistics(positions: NDArray[np.float64],
+                      values: NDArray[np.float64], start_index: int,
+                      end_index: int, window_length: Optional[float],
+                      step: float) -> PieceStatistics:
+    """ Calculates count, mean and standard deviation of windows of fixed
+        length that are moved along the tape in steps. NaN values are
+        skipped.
+
+    The windows start at the start position and every multiple of step
+    after it. If the last window does not reach the end, a window ending at
+    the end position is added. Window k covers the samples from
+    start_positions[k] up to (excluding) end_positions[k]. All windows are
+    evaluated with prefix sums, so the cost does not depend on the number
+    of windows per sample. Minimum and maximum are not calculated (NaN).
+
+    Args:
+        positions (NDArray): Ascending positions of the tape.
+        values (NDArray): Values of the tape.
+        start_index (int): Index of the start of the tape.
+        end_index (int): Index of the end of the tape.
+        window_length (float, optional): Length of the windows. If None, use
+            the whole length.
+        step (float): Distance between the starts of two windows.
+
+    Raises:
+        ValueError: Raised if the step or window length is not positive.
+
+    Returns:
+        PieceStatistics: Statistics of all windows.
+    """
+    if step <= 0.0 or (window_length is not None and window_length <= 0.0):
+        raise ValueError("Window length and step must be positive.")
+
+    start_position = positions[start_index]
+    end_position = positions[end_index]
+    length = end_position - start_position
+    if window_length is not None and window_length < length:
+        count = int((length - window_length) / step) + 1
+        starts = start_position + step * np.arange(count)
+        if starts[-1] + window_length < end_position:
+            starts = np.append(starts, end_position - window_length)
+        ends = starts + window_length
+    else:
+        starts = np.array([start_position])
+        ends = np.array([end_position])
+
+    segment_positions = positions[start_index:end_index]
+    lower = np.searchsorted(segment_positions, starts, side='left')
+    upper = np.searchsorted(segment_positions, ends, side='left')
+
+    # shift by the overall mean to keep the prefix sums small
+    segment = values[start_index:end_index]
+    finite = ~np.isnan(segment)
+    shift = float(np.mean(segment[finite])) if finite.any() else 0.0
+    shifted = np.where(finite, segment - shift, 0.0)
+
+    prefix_count = np.concatenate(([0], np.cumsum(finite)))
+    prefix_sums = np.concatenate(([0.0], np.cumsum(shifted)))
+    prefix_squares = np.concatenate(([0.0], np.cumsum(shifted * shifted)))
+    count = prefix_count[upper] - prefix_count[lower]
+    sums = prefix_sums[upper] - prefix_sums[lower]
+    squares = prefix_squares[upper] - prefix_squares[lower]
+
+    mean, std = _mean_std(np.full(count.size, shift), count, sums, squares)
+
+    return PieceStatistics(start_positions=starts,
+                           end_positions=ends,
+                           count=count,
+                           mean=mean,
+                           std=std,
+                           minimum=np.full(count.size, np.nan),
+                           maximum=np.full(count.size, np.nan))
+
+
+def _mean_std(
+        shifts: NDArray[np.float64], count: NDArray[np.intp],
+        sums: NDArray[np.float64], squares: NDArray[np.float64]
+) -> tuple[NDArray[np.float64], NDArray[np.float64]]:
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = shifts + sums / count
+        variance = (squares - sums * sums / count) / (count - 1)
+    mean = np.where(count > 0, mean, np.nan)
+    std = np.where(count > 1, np.sqrt(np.maximum(variance, 0.0)), np.nan)
+    return mean, std
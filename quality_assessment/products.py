@@ -1,7 +1,7 @@
 """ Definition of different HTS tape products
 """
 from enum import Enum
-from math import exp
+from numpy import exp
 from .data_types import TapeSpecs
 
 
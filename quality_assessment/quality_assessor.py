@@ -1,13 +1,19 @@
 """ Class implementation for TapeQualityAssessor
 """
 import os
+from typing import Callable, Iterable, Optional, Sequence
+import numpy as np
 import matplotlib.pyplot as plt
+from matplotlib.axes import Axes
+from matplotlib.collections import LineCollection
 from matplotlib.figure import Figure
-from .data_types import (QualityReport, TestType, TapeSpecs, TapeSection)
+from .data_types import (QualityParameterInfo, QualityParameterArray,
+                         QualityReport, TestType, TapeSpecs, TapeSection)
+from .decimation import PLOT_BUCKETS, min_max_indices
 from .products import TapeProduct
 from .helper import load_data
 from .tape_quality_information import TapeQualityInformation
-from .quality_pdf_report import ReportPDFCreator
+from .quality_pdf_report import PlotImageSettings, ReportPDFCreator
 
 
 class TapeQualityAssessor:
@@ -21,18 +27,30 @@ class TapeQualityAssessor:
         self.quality_reports: list[QualityReport] = []
         self.ok_tape_sections: list[TapeSection] = []
 
-    def assess_meets_specs(self) -> None:
+    def assess_meets_specs(self, workers: int = 1) -> None:
         """ Kicks off assessment for various quality parameters and stores
             quality reports.
+
+        Args:
+            workers (int, optional): Number of threads analysing segments of
+                the tape in parallel. Defaults to 1.
         """
         # calculate necessary quality information
-        self.tape_quality_info.calculate_statisitcs(
-            TestType.AVERAGE, self.tape_specs.averaging_length)
-        self.tape_quality_info.calculate_statisitcs(
-            TestType.SCATTER, self.tape_specs.averaging_length)
+        self.tape_quality_info.calculate_piecewise_statistics(
+            self.tape_specs.averaging_length, workers)
+        if self.tape_specs.averaging_step is not None:
+            self.tape_quality_info.calculate_moving_statistics(
+                self.tape_specs.averaging_length,
+                self.tape_specs.averaging_step)
         self.tape_quality_info.calculate_drop_out_info(
-            self.tape_specs.width_from_true_baseline)
+            self.tape_specs.width_from_true_baseline, workers=workers)
+
+        self.evaluate_specs()
 
+    def evaluate_specs(self) -> None:
+        """ Evaluates the already calculated quality information against the
+            specs and stores quality reports.
+        """
         try:
             self.quality_reports.append(self.assess_average_value())
         except ValueError as error:
@@ -50,52 +68,44 @@ class TapeQualityAssessor:
         Args:
             min_length (float): Minimum length a defect-free tape section must be
         """
-        tape_sections = [self.tape_quality_info.tape_section]
-
-        for q_report in self.quality_reports:
-            if q_report.fail_information is None:
-                continue
-            for fail_info in q_report.fail_information:
-                # find all sections that overlap with the current defect
-                sections_to_devide = [
-                    section for section in tape_sections
-                    if (fail_info.start_position > section.start_position
-                        and fail_info.start_position < section.end_position) or
-                    (fail_info.end_position > section.start_position
-                     and fail_info.end_position < section.end_position)
-                ]
-                for section in sections_to_devide:
-                    # remove section, then cut defective part from section and
-                    # append it again
-                    tape_sections.remove(section)
-                    if fail_info.end_position > section.end_position:
-                        tape_sections.append(
-                            TapeSection(section.start_position,
-                                        fail_info.start_position))
-                    elif fail_info.start_position < section.start_position:
-                        tape_sections.append(
-                            TapeSection(fail_info.end_position,
-                                        section.end_position))
-                    else:
-                        tape_sections.append(
-                            TapeSection(section.start_position,
-                                        fail_info.start_position))
-                        tape_sections.append(
-                            TapeSection(fail_info.end_position,
-                                        section.end_position))
-
-        tape_sections = [
-            tape_sec for tape_sec in tape_sections
-            if tape_sec.length >= min_length
+        tape_section = self.tape_quality_info.tape_section
+        fails = [np.column_stack(
+            (_attribute_array(q_report.fail_information, 'start_position'),
+             _attribute_array(q_report.fail_information, 'end_position')))
+                 for q_report in self.quality_reports
+                 if q_report.fail_information is not None]
+        fails_array = np.concatenate([np.empty((0, 2))] + fails)
+        fails_array = fails_array[np.argsort(fails_array[:, 0], kind='stable')]
+
+        # OK sections are the gaps between the merged defects, i.e. between
+        # the furthest end of all defects so far and the start of the next.
+        covered_until = np.maximum.accumulate(fails_array[:, 1])
+        starts = np.maximum(np.concatenate(([tape_section.start_position],
+                                            covered_until)),
+                            tape_section.start_position)
+        ends = np.minimum(np.concatenate((fails_array[:, 0],
+                                          [tape_section.end_position])),
+                          tape_section.end_position)
+        lengths = ends - starts
+        keep = (lengths > 0.0) & (lengths >= min_length)
+
+        self.ok_tape_sections = [
+            TapeSection(start, end)
+            for start, end in zip(starts[keep].tolist(), ends[keep].tolist())
         ]
 
-        self.ok_tape_sections = tape_sections
-
-    def save_pdf_report(self, to_dir: str = "") -> None:
+    def save_pdf_report(self, to_dir: str = "", decimate: bool = True,
+                        image_settings: Optional[PlotImageSettings] = None
+                        ) -> None:
         """ Creates PDF report for the tape and saves it.
 
         Args:
             to_dir (str, optional): Directory to save the pdf to. Defaults to "".
+            decimate (bool, optional): Plot a peak-preserving selection of
+                the data instead of all samples. Defaults to True.
+            image_settings (PlotImageSettings, optional): Format and
+                resolution of the embedded plot. Defaults to None, i.e.
+                PlotImageSettings().
 
         Raises:
             ValueError: Raised if dirname is not a directory
@@ -105,19 +115,23 @@ class TapeQualityAssessor:
 
         pdf_report = ReportPDFCreator(self.tape_quality_info.tape_id,
                                       self.tape_specs.description,
-                                      self._make_plot(),
+                                      self._make_plot(decimate),
                                       self.quality_reports,
-                                      self.ok_tape_sections)
+                                      self.ok_tape_sections,
+                                      image_settings or PlotImageSettings())
         pdf_report.create_report()
         file_name = os.path.join(
             to_dir, f"Report {self.tape_quality_info.tape_id}.pdf")
         pdf_report.save_report(file_name)
-        pdf_report.data_plot.clear()
 
-    def plot_defects(self) -> None:
+    def plot_defects(self, decimate: bool = True) -> None:
         """ Shows plot in a window.
+
+        Args:
+            decimate (bool, optional): Plot a peak-preserving selection of
+                the data instead of all samples. Defaults to True.
         """
-        _ = self._make_plot()
+        _ = self._make_plot(decimate, plt.figure(figsize=(9.5, 3.1)))
 
         plt.show()
 
@@ -135,7 +149,8 @@ class TapeQualityAssessor:
                     print(fail_info.description)
 
     def assess_average_value(self) -> QualityReport:
-        """Assesses if average value meet the specs.
+        """Assesses if average value meet the specs. Moving averages are used
+            if the specs define an averaging step.
 
         Raises:
             ValueError: In case no averages are available in Quality Info
@@ -143,15 +158,13 @@ class TapeQualityAssessor:
         Returns:
             QualityReport: Quality report on average values.
         """
-        if self.tape_quality_info.averages is None:
+        averages = self.tape_quality_info.averages
+        if self.tape_specs.averaging_step is not None:
+            averages = self.tape_quality_info.moving_averages
+        if averages is None:
             raise ValueError("No Averages available.")
-        if self.tape_specs.min_average is None:
-            raise ValueError("Averages are not specified.")
-
-        threshold = self.tape_specs.min_average
-        parameter_infos = self.tape_quality_info.averages
 
-        fails = list(filter(lambda x: x.value < threshold, parameter_infos))
+        fails = average_fails(averages, self.tape_specs)
 
         return QualityReport(self.tape_quality_info.tape_id, TestType.AVERAGE,
                              fails)  # type: ignore
@@ -162,10 +175,8 @@ class TapeQualityAssessor:
         Returns:
             QualityReport: Quality report on minimum values.
         """
-        threshold = self.tape_specs.min_value
-        parameter_infos = self.tape_quality_info.dropouts
-
-        fails = list(filter(lambda x: x.value < threshold, parameter_infos))
+        fails = min_value_fails(self.tape_quality_info.dropouts,
+                                self.tape_specs)
 
         return QualityReport(self.tape_quality_info.tape_id, TestType.MINIMUM,
                              fails)  # type: ignore
@@ -179,22 +190,8 @@ class TapeQualityAssessor:
         Returns:
             QualityReport: Quality report on drop-outs.
         """
-        if (self.tape_specs.dropout_func is None
-                or self.tape_specs.dropout_value is None):
-            raise ValueError("Drop-outs are not specified.")
-        # A peak is a drop-out if it is smaller than min Ic
-        threshold = self.tape_specs.min_value
-        parameter_infos = self.tape_quality_info.dropouts
-        fails = list(filter(lambda x: x.value < threshold, parameter_infos))
-
-        # A drop-out is a fail if it is too wide or below a min Drop-out Ic
-        width_func = self.tape_specs.dropout_func
-        min_ic = self.tape_specs.dropout_value
-
-        fails = list(
-            filter(
-                lambda x: x.value < min_ic or x.width * 1000.0 > width_func(
-                    x.value), fails))
+        fails = dropout_fails(self.tape_quality_info.dropouts,
+                              self.tape_specs)
 
         return QualityReport(self.tape_quality_info.tape_id, TestType.DROPOUT,
                              fails)  # type: ignore
@@ -203,61 +200,218 @@ class TapeQualityAssessor:
         """ Plots Histogram of drop-out widths (Just to show what
             kind of statistics can be done).
         """
+        fig = self._make_dropout_histogram(plt.figure())
+
+        fig.show()
+
+    def _make_dropout_histogram(self,
+                                fig: Optional[Figure] = None) -> Figure:
         widths = [x.width*1000 for x in self.tape_quality_info.dropouts]
 
-        fig = plt.figure(num='Histogram')
-        fig.set_tight_layout(True)
+        if fig is None:
+            fig = Figure()
+        fig.set_layout_engine('tight')
         axis = fig.subplots()
         axis.set_xlabel("Width (mm)")
         axis.set_ylabel("Count")
         axis.grid()
         axis.hist(widths, bins=60, density=True)
 
-        fig.show()
+        return fig
 
-    def _make_plot(self) -> Figure:
-        data = self.tape_quality_info.data
-        fig = plt.figure(num='Figure', figsize=(9.5, 3.1))
-        fig.set_tight_layout(True)
+    def _make_plot(self, decimate: bool = True,
+                   fig: Optional[Figure] = None) -> Figure:
+        # Draws into a new standalone figure, which is not registered with
+        # pyplot, unless a figure is given. Standalone figures are owned by
+        # the caller only, so reports can be rendered in several threads
+        # and are released with the last reference.
+        trace = self.tape_quality_info.trace
+        positions, values = trace.positions, trace.values
+        if decimate:
+            # keep the peaks of all drop-outs and the centers of all fails in
+            # addition to the extremes, also if the drop-outs of the tape
+            # info were not calculated (e.g. when rendering a report of a
+            # tape assessed in another process)
+            centers = self._fail_attributes(tuple(TestType),
+                                            ('center_position',))[0]
+            keep = np.concatenate((
+                self.tape_quality_info._peak_indices(),
+                np.minimum(np.searchsorted(positions, centers),
+                           positions.size - 1)))
+            indices = min_max_indices(values, PLOT_BUCKETS, keep)
+            positions, values = positions[indices], values[indices]
+        if fig is None:
+            fig = Figure(figsize=(9.5, 3.1))
+        fig.set_layout_engine('tight')
         axis = fig.subplots()
         axis.set_xlabel("Position (m)")
         axis.set_ylabel("Critical Current (A)")
         axis.grid()
-        axis.plot(data.iloc[:, 0], data.iloc[:, 1], label='Data', linewidth=0.5)
-
-        # plot fail reports
-        for report in self.quality_reports:
-            if report.fail_information is None:
-                continue
-            for fail in report.fail_information:
-                x = [fail.start_position,
-                     fail.end_position]
-                y = [fail.value,
-                     fail.value]
-
-                if report.test_type == TestType.AVERAGE:
-                    color = 'crimson'
-                    axis.plot(x, y,
-                              color=color,
-                              marker='|',
-                              linewidth=1.0,
-                              label='Averages Failed')
-                elif report.test_type in [TestType.MINIMUM, TestType.DROPOUT]:
-                    color = 'deeppink'
-                    axis.scatter([fail.center_position],
-                                 [fail.value],
-                                 color=color,
-                                 s=15,
-                                 marker='D',
-                                 label='Minimum Failed')
-                    axis.plot(x, y,
-                              color=color,
-                              marker='|',
-                              linewidth=1.0,
-                              label='Minimum Failed')
+        axis.plot(positions, values, label='Data', linewidth=0.5)
+
+        # plot fail reports, one set of artists per kind of failure
+        starts, ends, values = self._fail_attributes(
+            (TestType.AVERAGE,), ('start_position', 'end_position', 'value'))
+        _plot_fail_ranges(axis, starts, ends, values,
+                          color='crimson', label='Averages Failed')
+        starts, ends, centers, values = self._fail_attributes(
+            (TestType.MINIMUM, TestType.DROPOUT),
+            ('start_position', 'end_position', 'center_position', 'value'))
+        _plot_fail_ranges(axis, starts, ends, values,
+                          color='deeppink', label='Minimum Failed')
+        if values.size > 0:
+            axis.scatter(centers, values, color='deeppink', s=15, marker='D')
+        axis.autoscale_view()
 
         return fig
 
+    def _fail_attributes(self, test_types: tuple[TestType, ...],
+                         names: tuple[str, ...]) -> list[np.ndarray]:
+        # arrays of the named attributes of all fails of the given test types
+        fails = [report.fail_information for report in self.quality_reports
+                 if report.fail_information is not None
+                 and report.test_type in test_types]
+        return [np.concatenate([_attribute_array(infos, name)
+                                for infos in fails] or [np.empty(0)])
+                for name in names]
+
+
+def assess_products(quality_info: TapeQualityInformation,
+                    products: Iterable[TapeSpecs]) -> list[TapeQualityAssessor]:
+    """ Assesses a tape against several products. Each distinct statistics
+        configuration (averaging length and step, baseline) is calculated
+        only once and shared by all products using it.
+
+    Args:
+        quality_info (TapeQualityInformation): Quality information about the tape
+        products (Iterable[TapeSpecs]): Product definitions to assess the
+            tape against
+
+    Returns:
+        list[TapeQualityAssessor]: One assessor per product, holding its
+            quality reports and OK tape sections.
+    """
+    assessors = []
+    for product in products:
+        assessor = TapeQualityAssessor(quality_info.copy(), product)
+        assessor.assess_meets_specs()
+        assessor.determine_ok_tape_section(product.min_tape_length)
+        assessors.append(assessor)
+
+    return assessors
+
+
+def _plot_fail_ranges(axis: Axes, starts: np.ndarray, ends: np.ndarray,
+                      values: np.ndarray, color: str, label: str) -> None:
+    # Draws all fail ranges as one line collection with tick marks at their
+    # ends, so that the number of artists does not grow with the number of
+    # fails.
+    if values.size == 0:
+        return
+    segments = np.stack((np.column_stack((starts, values)),
+                         np.column_stack((ends, values))), axis=1)
+    axis.add_collection(LineCollection(segments, colors=color,
+                                       linewidths=1.0, label=label))
+    axis.plot(np.concatenate((starts, ends)), np.concatenate((values, values)),
+              color=color, marker='|', linestyle='none')
+
+
+def average_fails(averages: Sequence[QualityParameterInfo],
+                  tape_specs: TapeSpecs) -> Sequence[QualityParameterInfo]:
+    """ Selects the piecewise averages that do not meet the specs.
+
+    Args:
+        averages (Sequence[QualityParameterInfo]): Piecewise averages.
+        tape_specs (TapeSpecs): Specs to test against.
+
+    Raises:
+        ValueError: In case averages are not specified.
+
+    Returns:
+        Sequence[QualityParameterInfo]: Failed averages.
+    """
+    if tape_specs.min_average is None:
+        raise ValueError("Averages are not specified.")
+
+    values = _attribute_array(averages, 'value')
+
+    return _select(averages, values < tape_specs.min_average)
+
+
+def min_value_fails(peaks: Sequence[QualityParameterInfo],
+                    tape_specs: TapeSpecs) -> Sequence[QualityParameterInfo]:
+    """ Selects the peaks that are below the minimum value of the specs.
+
+    Args:
+        peaks (Sequence[QualityParameterInfo]): Peak information.
+        tape_specs (TapeSpecs): Specs to test against.
+
+    Returns:
+        Sequence[QualityParameterInfo]: Failed peaks.
+    """
+    values = _attribute_array(peaks, 'value')
+
+    return _select(peaks, values < tape_specs.min_value)
+
+
+def dropout_fails(peaks: Sequence[QualityParameterInfo],
+                  tape_specs: TapeSpecs) -> Sequence[QualityParameterInfo]:
+    """ Selects the drop-outs that do not meet the specs.
+
+    Args:
+        peaks (Sequence[QualityParameterInfo]): Peak information.
+        tape_specs (TapeSpecs): Specs to test against.
+
+    Raises:
+        ValueError: Exception if drop-outs are not in TapeSpecs
+
+    Returns:
+        Sequence[QualityParameterInfo]: Failed drop-outs.
+    """
+    if (tape_specs.dropout_func is None
+            or tape_specs.dropout_value is None):
+        raise ValueError("Drop-outs are not specified.")
+    values = _attribute_array(peaks, 'value')
+    widths = (_attribute_array(peaks, 'end_position') -
+              _attribute_array(peaks, 'start_position'))
+
+    # A peak is a drop-out if it is smaller than min Ic
+    failed = values < tape_specs.min_value
+
+    # A drop-out is a fail if it is too wide or below a min Drop-out Ic
+    max_widths = _apply_to_array(tape_specs.dropout_func, values[failed])
+    failed[failed] = ((values[failed] < tape_specs.dropout_value) |
+                      (widths[failed] * 1000.0 > max_widths))
+
+    return _select(peaks, failed)
+
+
+def _attribute_array(infos: Sequence[QualityParameterInfo],
+                     name: str) -> np.ndarray:
+    if isinstance(infos, QualityParameterArray):
+        return getattr(infos, name)
+    return np.fromiter((getattr(info, name) for info in infos), dtype=float,
+                       count=len(infos))
+
+
+def _select(infos: Sequence[QualityParameterInfo],
+            mask: np.ndarray) -> Sequence[QualityParameterInfo]:
+    if isinstance(infos, QualityParameterArray):
+        return infos[mask]
+    return [infos[i] for i in np.flatnonzero(mask).tolist()]
+
+
+def _apply_to_array(func: Callable[[float], float],
+                    values: np.ndarray) -> np.ndarray:
+    # apply func to the whole array at once, fall back to calling it for
+    # every element for callables that only accept scalars
+    try:
+        result = np.asarray(func(values), dtype=float)  # type: ignore
+        return np.broadcast_to(result, values.shape)
+    except (TypeError, ValueError):
+        return np.array([func(value) for value in values.tolist()],
+                        dtype=float).reshape(values.shape)
+
 
 def excecute_assessment(quality_info: TapeQualityInformation,
                         product: TapeSpecs) -> None:
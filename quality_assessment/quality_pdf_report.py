@@ -1,14 +1,50 @@
 """ Class implementation for DefectReportPDF
 """
 import os
-from typing import List, Optional
+from dataclasses import dataclass
+from enum import Enum
+from functools import lru_cache
+from io import BytesIO
+from typing import List, Optional, Union
 from fpdf import FPDF
+from fpdf.image_datastructures import RasterImageInfo
+from fpdf.image_parsing import get_img_info
 from matplotlib.backends.backend_agg import FigureCanvasAgg as FigureCanvas
 from matplotlib.figure import Figure
-import numpy
 from PIL import Image
 from .data_types import QualityReport, TapeSection
 
+LOGO_PATH = os.sep.join([os.path.dirname(__file__), 'assets', 'THEVA-Logo.png'])
+
+
+class PlotImageFormat(Enum):
+    """ Enum of the formats the data plot can be embedded in the PDF with.
+    """
+    PNG = 'png'     # lossless RGB bitmap
+    JPEG = 'jpeg'   # lossy RGB bitmap, embedded without re-encoding
+    SVG = 'svg'     # vector graphics, best with a decimated trace
+
+
+@dataclass(frozen=True)
+class PlotImageSettings:
+    """ Holds the settings for embedding the data plot in the PDF.
+
+    Attributes:
+    -----------
+        image_format (PlotImageFormat): Format of the embedded plot.
+        dpi (float): Resolution of bitmap formats in dots per inch.
+        jpeg_quality (int): JPEG quality from 1 to 95.
+    """
+    image_format: PlotImageFormat = PlotImageFormat.PNG
+    dpi: float = 100.0
+    jpeg_quality: int = 85
+
+    def __post_init__(self):
+        if self.dpi <= 0:
+            raise ValueError("DPI must be positive.")
+        if not 1 <= self.jpeg_quality <= 95:
+            raise ValueError("JPEG quality must be between 1 and 95.")
+
 
 class DefectReportPDF(FPDF):
     """ Subclass of FPDF to set up page structure
@@ -17,14 +53,13 @@ class DefectReportPDF(FPDF):
         self.tape_id = tape_id
         self.product = product
         super().__init__(orientation=orientation)  # type: ignore
+        self._add_static_image(LOGO_PATH)
 
     def header(self):
         """ Draw header
         """
         # Rendering logo:
-        logo_path = os.sep.join(
-            [os.path.dirname(__file__), 'assets', 'THEVA-Logo.png'])
-        self.image(logo_path, self.l_margin, self.t_margin, 60)
+        self.image(LOGO_PATH, self.l_margin, self.t_margin, 60)
         # Setting font: helvetica bold 15
         self.set_font("helvetica", "B", 20)
         # Moving cursor to the right:
@@ -52,6 +87,29 @@ class DefectReportPDF(FPDF):
         # Printing page number:
         self.cell(0, 10, f"Page {self.page_no()}/{{nb}}", 0, 0, "C")
 
+    def _add_static_image(self, path: str) -> None:
+        # Puts the image decoded once per process into the image cache of
+        # this document, like fpdf's preload_image does for images that are
+        # new to the document, so that image(path) does not decode it again.
+        # This relies on fpdf's image cache, see the fpdf2 version pinned in
+        # setup.py. The core fonts used need no loading, their metrics are
+        # static in fpdf.
+        info = RasterImageInfo(_static_image_info(path))
+        info.update(i=len(self.image_cache.images) + 1, usages=0,
+                    iccp_i=None)
+        iccp = info.get("iccp")
+        if iccp is not None:
+            icc_profiles = self.image_cache.icc_profiles
+            info["iccp_i"] = icc_profiles.setdefault(iccp, len(icc_profiles))
+            info["iccp"] = None
+        self.image_cache.images[path] = info
+
+
+@lru_cache(maxsize=None)
+def _static_image_info(path: str) -> RasterImageInfo:
+    # decoded and compressed image data shared by all reports of a process
+    return get_img_info(path)
+
 
 class ReportPDFCreator():
     """ Class to create report PDF
@@ -61,11 +119,13 @@ class ReportPDFCreator():
     def __init__(self, tape_id: str, product: str,
                  data_plot: Figure,
                  quality_reports: List[QualityReport],
-                 ok_tape_sections: List[TapeSection]):
+                 ok_tape_sections: List[TapeSection],
+                 image_settings: PlotImageSettings = PlotImageSettings()):
 
         self.tape_id = tape_id
         self.product = product
         self.data_plot = data_plot
+        self.image_settings = image_settings
         self.quality_reports = quality_reports
         self.ok_tape_sections = ok_tape_sections
 
@@ -108,10 +168,29 @@ class ReportPDFCreator():
                         width: float) -> None:
         pdf.set_y(y)
 
-        canvas = FigureCanvas(self.data_plot)
-        canvas.draw()
-        img = Image.fromarray(numpy.asarray(canvas.buffer_rgba()))
-        pdf.image(img, x=x, w=width)
+        pdf.image(self._plot_image(), x=x, w=width)
+
+    def _plot_image(self) -> Union[BytesIO, Image.Image]:
+        # bitmaps without alpha channel, PNG handed to fpdf as pixels, which
+        # it deflates itself, JPEG and SVG encoded in memory
+        settings = self.image_settings
+        buffer = BytesIO()
+        if settings.image_format == PlotImageFormat.SVG:
+            # without metadata, which fpdf does not support
+            self.data_plot.savefig(buffer, format='svg', metadata={
+                'Creator': None, 'Date': None, 'Format': None, 'Type': None})
+        else:
+            self.data_plot.set_dpi(settings.dpi)
+            canvas = FigureCanvas(self.data_plot)
+            canvas.draw()
+            rgba = canvas.buffer_rgba()
+            image = Image.frombuffer('RGBA', (rgba.shape[1], rgba.shape[0]),
+                                     rgba, 'raw', 'RGBA', 0, 1).convert('RGB')
+            if settings.image_format == PlotImageFormat.PNG:
+                return image
+            image.save(buffer, format='JPEG', quality=settings.jpeg_quality)
+        buffer.seek(0)
+        return buffer
 
     def _draw_ok_tape_section_list(self, pdf: DefectReportPDF, x: float,
                                    y: float) -> None:
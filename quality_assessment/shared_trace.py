@@ -0,0 +1,120 @@
+""" Shared memory transport of tape traces between processes
+"""
+from dataclasses import dataclass
+from multiprocessing.shared_memory import SharedMemory
+from typing import Optional
+import numpy as np
+from .tape_trace import TapeTrace
+
+
+@dataclass(frozen=True)
+class SharedTraceHandle:
+    """ Small, picklable reference to a trace in shared memory, sent to
+        other processes instead of the arrays.
+
+    Attributes:
+    -----------
+        name (str): Name of the shared memory block.
+        size (int): Number of samples of the trace.
+    """
+    name: str
+    size: int
+
+
+class SharedTrace:
+    """ TapeTrace held in a named shared memory block. The block is written
+        once by create() and any process can attach to it by its handle and
+        use the trace as a zero-copy view, e.g. to create a
+        TapeQualityInformation.
+
+    The creating process owns the block: it is removed by unlink(), or when
+    leaving the with block of the owner. Every process has to close() the
+    block when done, after all views on the trace have been released. On
+    Windows, the block only exists as long as some process has it open.
+
+    Attributes:
+    -----------
+        handle (SharedTraceHandle): Reference to send to other processes.
+        trace (TapeTrace): Trace viewing the shared memory.
+        owner (bool): True if the block was created by this object.
+    """
+    def __init__(self, shared_memory: SharedMemory, size: int,
+                 owner: bool) -> None:
+        self._shared_memory: Optional[SharedMemory] = shared_memory
+        self.handle = SharedTraceHandle(shared_memory.name, size)
+        self.owner = owner
+
+    @classmethod
+    def create(cls, trace: TapeTrace,
+               name: Optional[str] = None) -> 'SharedTrace':
+        """ Copies a trace into a new shared memory block.
+
+        Args:
+            trace (TapeTrace): Trace to share.
+            name (str, optional): Name of the new block, e.g. chosen by the
+                process that is responsible for removing it. If None, a
+                unique name is generated. Defaults to None.
+
+        Returns:
+            SharedTrace: Owner of the new block.
+        """
+        size = len(trace)
+        shared_memory = SharedMemory(name=name, create=True,
+                                     size=max(2 * size * 8, 1))
+        shared = cls(shared_memory, size, owner=True)
+        arrays = shared._arrays()
+        arrays[0] = trace.positions
+        arrays[1] = trace.values
+        del arrays
+        return shared
+
+    @classmethod
+    def attach(cls, handle: SharedTraceHandle) -> 'SharedTrace':
+        """ Attaches to an existing shared memory block.
+
+        Args:
+            handle (SharedTraceHandle): Reference to the block.
+
+        Returns:
+            SharedTrace: Access to the shared trace.
+        """
+        return cls(SharedMemory(name=handle.name), handle.size, owner=False)
+
+    @property
+    def trace(self) -> TapeTrace:
+        arrays = self._arrays()
+        return TapeTrace(arrays[0], arrays[1])
+
+    def close(self) -> None:
+        """ Closes the access to the block of this process. All views on the
+            trace must have been released before.
+        """
+        if self._shared_memory is not None:
+            self._shared_memory.close()
+            self._shared_memory = None
+
+    def unlink(self) -> None:
+        """ Removes the block, so that its memory is freed once every
+            process has closed it. Should be called once, usually by the
+            owner.
+        """
+        shared_memory = self._shared_memory
+        if shared_memory is None:
+            shared_memory = SharedMemory(name=self.handle.name)
+        shared_memory.unlink()
+        if shared_memory is not self._shared_memory:
+            shared_memory.close()
+
+    def __enter__(self) -> 'SharedTrace':
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
+        if self.owner:
+            self.unlink()
+
+    def _arrays(self) -> np.ndarray:
+        if self._shared_memory is None:
+            raise ValueError("Shared trace is closed.")
+        return np.ndarray((2, self.handle.size), dtype=np.float64,
+                          buffer=self._shared_memory.buf)
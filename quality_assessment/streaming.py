@@ -0,0 +1,825 @@
+""" Incremental analysis of HTS tape data arriving in chunks
+"""
+import os
+import time
+from typing import Iterator, Optional, Sequence
+from io import BytesIO
+from dataclasses import dataclass, field
+from math import sqrt
+import numpy as np
+from numpy.typing import ArrayLike
+from pandas import read_csv
+from scipy.signal import find_peaks
+from .data_types import (AveragesInfo, PeakInfo, QualityParameterArray,
+                         QualityReport, ScatterInfo, TapeSection, TapeSpecs,
+                         TestType)
+from .drop_out_analysis import (PEAK_DISTANCE, half_max_positions,
+                                merge_duplicate_peaks, select_by_peak_distance)
+from .helper import load_data_chunks
+from .piecewise_statistics import piecewise_statistics
+from .quality_assessor import (TapeQualityAssessor, average_fails,
+                               dropout_fails, min_value_fails)
+
+@dataclass
+class StreamingUpdate:
+    """ Results completed by an update of a StreamingTapeAnalyzer.
+
+    Attributes:
+    -----------
+        averages (list[AveragesInfo]): Newly completed piecewise averages.
+        scattering (list[ScatterInfo]): Newly completed piecewise scattering.
+        dropouts (list[PeakInfo]): Newly completed drop-outs.
+    """
+    averages: list[AveragesInfo] = field(default_factory=list)
+    scattering: list[ScatterInfo] = field(default_factory=list)
+    dropouts: list[PeakInfo] = field(default_factory=list)
+
+
+class _SampleBuffer:
+    """ Growable buffer of the retained positions and values. Appending and
+        discarding cost time proportional to the appended samples (amortized),
+        not to the retained ones.
+    """
+    def __init__(self) -> None:
+        self._data = np.empty((2, 0))
+        self._first = 0
+        self._end = 0
+        # index of the first retained sample in the whole stream
+        self.offset = 0
+
+    @property
+    def positions(self) -> np.ndarray:
+        return self._data[0, self._first:self._end]
+
+    @property
+    def values(self) -> np.ndarray:
+        return self._data[1, self._first:self._end]
+
+    def append(self, positions: np.ndarray, values: np.ndarray) -> None:
+        size = self._end - self._first
+        if self._end + positions.size > self._data.shape[1]:
+            # move the samples to the front of the buffer, reallocate it only
+            # if it would be more than half full
+            capacity = self._data.shape[1]
+            if 2 * (size + positions.size) > capacity:
+                capacity = max(2 * (size + positions.size), 1024)
+            data = np.empty((2, capacity))
+            data[:, :size] = self._data[:, self._first:self._end]
+            self._data = data
+            self._first = 0
+            self._end = size
+        self._data[0, self._end:self._end + positions.size] = positions
+        self._data[1, self._end:self._end + positions.size] = values
+        self._end += positions.size
+
+    def discard(self, count: int) -> None:
+        self._first += count
+        self.offset += count
+
+
+class StreamingTapeAnalyzer:
+    """ Calculates piecewise statistics and drop-outs of a HTS tape from data
+        arriving in chunks of ascending positions.
+
+    The results are the same as those of TapeQualityInformation. Drop-out
+    peaks are selected per chain of candidates closer than PEAK_DISTANCE
+    (see select_by_peak_distance) as soon as a gap of PEAK_DISTANCE follows
+    the chain. Only data that is still needed is kept: samples after the
+    last value above the tape threshold, the context of peaks that are not
+    resolved yet and a history reaching back to the last value above the
+    baseline. With
+    use_true_baseline, peaks are resolved once the piece they are in is
+    complete, so up to about two piece lengths of data are kept. Without a
+    piece length, the baseline is the average of the whole tape; it has to
+    be passed from a previous pass over the data (see assess_streaming),
+    otherwise no peak is resolved before finish().
+
+    At most max_history samples received before the latest chunk are kept.
+    If more are needed, e.g. for a section below the threshold or a chain of
+    peaks longer than that, update() raises a ValueError, so memory use is
+    bounded by max_history and the chunk size. Each update costs time
+    proportional to the chunk size and the data of unresolved peaks.
+
+    Descending positions (exports of reversed tapes) can't be streamed, as
+    the analysis starts at the smallest position. Use load_data and
+    TapeQualityInformation for them.
+
+    Like TapeQualityInformation, the analyzer provides tape_id, averages,
+    scattering, dropouts and tape_section, so that its results can be
+    evaluated by a TapeQualityAssessor (see assess_streaming).
+    """
+    def __init__(self,
+                 tape_id: str,
+                 expected_average: float,
+                 piece_length: Optional[float],
+                 use_true_baseline: bool,
+                 pos_tol: float = 2e-3,
+                 max_history: int = 1_000_000,
+                 baseline: Optional[Sequence[AveragesInfo]] = None) -> None:
+        """
+        Args:
+            tape_id (str): ID of the HTS tape.
+            expected_average (float): Approximate average critical current.
+            piece_length (Optional[float]): Length of the pieces for the
+                piecewise statistics. If None, the whole tape is one piece.
+            use_true_baseline (bool): Determine drop-out widths relative to
+                the average of the piece instead of the expected average.
+            pos_tol (float, optional): Tolerance for drop-out positions to
+                be identified as the same. Defaults to 2e-3.
+            max_history (int, optional): Maximum number of samples kept from
+                before the latest chunk. Defaults to 1_000_000.
+            baseline (Sequence[AveragesInfo], optional): Piecewise averages
+                of the whole tape from a previous pass. With
+                use_true_baseline, peaks are resolved with them as soon as
+                they are received. Defaults to None.
+        """
+        self.tape_id = tape_id
+        self.expected_average = expected_average
+        self.piece_length = piece_length
+        self.use_true_baseline = use_true_baseline
+        self.pos_tol = pos_tol
+        self.max_history = max_history
+        self.baseline = (None if baseline is None else
+                         QualityParameterArray.from_infos(AveragesInfo,
+                                                          baseline))
+
+        self.averages: list[AveragesInfo] = []
+        self.scattering: list[ScatterInfo] = []
+        self.dropouts: list[PeakInfo] = []
+
+        # retained samples, _offset is the index of the first one
+        self._buffer = _SampleBuffer()
+        self._finished = False
+
+        # indices of the tape start, the last value above the threshold and
+        # the first sample not yet added to the piecewise statistics
+        self._start: Optional[int] = None
+        self._head: Optional[int] = None
+        self._committed = 0
+
+        # state of the open piece
+        self._piece = 0
+        self._piece_start_position = 0.0
+        self._next_threshold: Optional[float] = None
+        self._count = 0
+        self._mean = 0.0
+        self._m2 = 0.0
+        self._max_average = (-np.inf if self.baseline is None else
+                             float(np.nanmax(self.baseline.value,
+                                             initial=-np.inf)))
+        # completed pieces that may contain peaks not handled yet
+        self._pieces = QualityParameterArray(AveragesInfo)
+        self._pieces_added = 0
+
+        # state of the drop-out detection: start of the next search for peak
+        # candidates, the first index a new candidate can have, candidates
+        # of the chain that is not complete yet and selected peaks on the
+        # tape that are not handled yet
+        self._scan_from = 0
+        self._next_candidate = 0
+        self._last_candidate = -1
+        self._chain_indices = np.empty(0, dtype=np.intp)
+        self._chain_values = np.empty(0)
+        self._peaks = np.empty(0, dtype=np.intp)
+        self._p_id = 0
+        self._last_peak = PeakInfo()
+        self._reported_dropouts = 0
+
+        # last sample above the baseline cap found by _trim, samples before
+        # _cap_scanned have been searched for cap
+        self._cap = np.nan
+        self._cap_scanned = 0
+        self._last_above_cap = -1
+
+    @property
+    def tape_section(self) -> TapeSection:
+        if self._start is None or self._head is None:
+            raise ValueError("No values above threshold, tape not found.")
+        return TapeSection(self._start_position, self._head_position)
+
+    @property
+    def _threshold(self) -> float:
+        return self.expected_average * 0.8
+
+    @property
+    def _positions(self) -> np.ndarray:
+        return self._buffer.positions
+
+    @property
+    def _values(self) -> np.ndarray:
+        return self._buffer.values
+
+    @property
+    def _offset(self) -> int:
+        return self._buffer.offset
+
+    def update(self, positions: ArrayLike, values: ArrayLike) -> StreamingUpdate:
+        """ Adds a chunk of data and calculates all results that are complete.
+
+        Args:
+            positions (ArrayLike): Ascending positions of the chunk.
+            values (ArrayLike): Values of the chunk.
+
+        Raises:
+            ValueError: Raised if positions are not ascending, the analyzer
+                is already finished or more than max_history samples would
+                have to be kept.
+
+        Returns:
+            StreamingUpdate: Results completed by this chunk.
+        """
+        if self._finished:
+            raise ValueError("Analyzer is already finished.")
+        positions = np.asarray(positions, dtype=np.float64)
+        values = np.asarray(values, dtype=np.float64)
+        result = StreamingUpdate()
+        if positions.size == 0:
+            return result
+        if (np.any(np.diff(positions) < 0.0) or
+                (self._positions.size > 0 and positions[0] < self._positions[-1])):
+            raise ValueError("Positions must be ascending, descending data "
+                             "can't be streamed.")
+
+        first_index = self._offset + self._positions.size
+        self._buffer.append(positions, values)
+
+        above = np.flatnonzero(values > self._threshold)
+        if above.size > 0:
+            if self._start is None:
+                self._start = first_index + int(above[0])
+                self._start_position = float(positions[above[0]])
+                self._committed = self._start
+                self._piece_start_position = self._start_position
+                if self.piece_length:
+                    self._next_threshold = (self._start_position +
+                                            self.piece_length)
+            self._head = first_index + int(above[-1])
+            self._head_position = float(positions[above[-1]])
+
+        self._commit(result)
+        self._detect_dropouts(result, final=False)
+        self._trim(first_index)
+
+        return result
+
+    def finish(self) -> StreamingUpdate:
+        """ Completes all results after the last chunk has been added.
+
+        Raises:
+            ValueError: Raised if no value is above the tape threshold.
+
+        Returns:
+            StreamingUpdate: Results completed by finishing.
+        """
+        if self._start is None:
+            raise ValueError("No values above threshold, tape not found.")
+        result = StreamingUpdate()
+
+        # remaining pieces end at the end of the tape
+        while (self._next_threshold is not None
+               and self._next_threshold < self._head_position):
+            self._close_piece(result, self._head_position)
+            self._next_threshold += self.piece_length  # type: ignore
+        self._close_piece(result, self._head_position)
+
+        self._detect_dropouts(result, final=True)
+        result.dropouts.extend(self.dropouts[self._reported_dropouts:])
+        self._reported_dropouts = len(self.dropouts)
+        self._finished = True
+
+        return result
+
+    def _commit(self, result: StreamingUpdate) -> None:
+        # Adds all samples before the last value above the threshold to the
+        # piecewise statistics. Later samples might be behind the tape end.
+        if self._head is None or self._head <= self._committed:
+            return
+        first = self._committed - self._offset
+        last = self._head - self._offset
+        positions = self._positions[first:last + 1]
+        values = self._values[first:last + 1]
+        count = last - first
+
+        thresholds = []
+        while (self._next_threshold is not None
+               and self._next_threshold < positions[count - 1]):
+            thresholds.append(self._next_threshold)
+            self._next_threshold += self.piece_length  # type: ignore
+        bounds = np.concatenate(
+            ([0], np.searchsorted(positions[:count], thresholds, side='right'),
+             [count])).astype(np.intp)
+
+        statistics = piecewise_statistics(positions, values, bounds)
+        m2 = np.where(statistics.count > 1,
+                      statistics.std**2 * (statistics.count - 1), 0.0)
+        pieces = bounds.size - 1
+        for i in range(pieces):
+            self._add_to_piece(int(statistics.count[i]),
+                               float(statistics.mean[i]), float(m2[i]))
+            if i < pieces - 1:
+                self._close_piece(result, float(statistics.end_positions[i]))
+
+        self._committed = self._head
+
+    def _add_to_piece(self, count: int, mean: float, m2: float) -> None:
+        # combine moments of two sets of samples (Chan et al.)
+        if count == 0:
+            return
+        total = self._count + count
+        delta = mean - self._mean
+        self._mean += delta * count / total
+        self._m2 += m2 + delta * delta * self._count * count / total
+        self._count = total
+
+    def _close_piece(self, result: StreamingUpdate, end_position: float) -> None:
+        mean = self._mean if self._count > 0 else float('nan')
+        std = (sqrt(self._m2 / (self._count - 1)) if self._count > 1 else
+               float('nan'))
+        average = AveragesInfo(p_id=self._piece,
+                               start_position=self._piece_start_position,
+                               end_position=end_position,
+                               value=mean)
+        scatter = ScatterInfo(p_id=self._piece,
+                              start_position=self._piece_start_position,
+                              end_position=end_position,
+                              value=std)
+        self.averages.append(average)
+        self.scattering.append(scatter)
+        if mean > self._max_average:
+            self._max_average = mean
+        result.averages.append(average)
+        result.scattering.append(scatter)
+
+        self._piece += 1
+        self._piece_start_position = end_position
+        self._count = 0
+        self._mean = 0.0
+        self._m2 = 0.0
+
+    def _detect_dropouts(self, result: StreamingUpdate, final: bool) -> None:
+        self._select_peaks(final)
+        if self._start is None or self._head is None:
+            return
+
+        # only handle peaks on the tape received so far, at the end the
+        # ones behind the tape are dropped
+        count = int(np.searchsorted(self._peaks, self._head, side='right'))
+        indices = self._peaks[:count] - self._offset
+        if final:
+            self._peaks = self._peaks[count:count]
+        if indices.size > 0:
+            self._handle_peaks(indices, final)
+
+        # the last drop-out may still be replaced by a deeper duplicate,
+        # which has to end within pos_tol of it, so its center can't be
+        # further behind
+        completed = len(self.dropouts)
+        if (not final and self.dropouts and self._next_peak_position()
+                <= self.dropouts[-1].end_position + self.pos_tol):
+            completed -= 1
+        if completed > self._reported_dropouts:
+            result.dropouts.extend(
+                self.dropouts[self._reported_dropouts:completed])
+            self._reported_dropouts = completed
+
+    def _handle_peaks(self, indices: np.ndarray, final: bool) -> None:
+        positions = self._positions
+        values = self._values
+        peak_positions = positions[indices]
+        peak_values = values[indices]
+
+        levels, resolved = self._peak_levels(peak_positions, final)
+        half_max = (peak_values + levels) / 2.0
+        keep = ~(half_max > levels)
+        start_positions = np.zeros(indices.size)
+        end_positions = np.zeros(indices.size)
+        start_positions[keep], end_positions[keep] = half_max_positions(
+            positions, values, indices[keep], half_max[keep])
+        if not final:
+            # the right edge has not been received yet
+            resolved &= ~keep | (end_positions < positions[-1])
+
+        # handle peaks in order, stop at the first unresolved one
+        count = indices.size if resolved.all() else int(np.argmin(resolved))
+        self._add_peaks(np.flatnonzero(keep[:count]), start_positions,
+                        end_positions, peak_positions, peak_values)
+        self._p_id += count
+        self._peaks = self._peaks[count:]
+
+    def _next_peak_position(self) -> float:
+        # smallest position a peak on the tape that is not handled yet can
+        # have: the next selected peak, the open chain or the next candidate
+        first = [self._next_candidate]
+        if self._peaks.size > 0:
+            first.append(int(self._peaks[0]))
+        chain = np.searchsorted(self._chain_indices, self._start)
+        if chain < self._chain_indices.size:
+            first.append(int(self._chain_indices[chain]))
+        index = min(first) - self._offset
+        positions = self._positions
+        return float(positions[min(index, positions.size - 1)])
+
+    def _select_peaks(self, final: bool) -> None:
+        # Searches the new data for peak candidates (find_peaks without the
+        # distance) and selects the peaks of the chains that are complete.
+        values = self._values
+        window_start = self._scan_from - self._offset
+        candidates, _ = find_peaks(-values[window_start:],
+                                   height=(-self._threshold, 0))
+        candidates += self._scan_from
+        candidates = candidates[candidates > self._last_candidate]
+        if candidates.size > 0:
+            self._last_candidate = int(candidates[-1])
+
+        # the last run of equal values can still become a candidate (at its
+        # middle) if it is below the threshold, so the next search starts
+        # right before it, otherwise at the last sample
+        if not final:
+            last = self._offset + values.size - 1
+            tail = values[window_start:]
+            changes = np.flatnonzero(tail[1:] != tail[:-1])
+            run_start = self._scan_from + (int(changes[-1]) + 1
+                                           if changes.size > 0 else 0)
+            if 0.0 <= values[-1] <= self._threshold:
+                self._scan_from = max(run_start - 1, self._scan_from)
+                self._next_candidate = (run_start + last) // 2
+            else:
+                self._scan_from = last
+                self._next_candidate = last + 1
+
+        # a chain is complete once a gap of PEAK_DISTANCE follows it, the
+        # candidates of the open chain have no such gap between them
+        chain_indices = np.concatenate((self._chain_indices, candidates))
+        chain_values = np.concatenate(
+            (self._chain_values, values[candidates - self._offset]))
+        if (final or chain_indices.size == 0 or
+                self._next_candidate - chain_indices[-1] >= PEAK_DISTANCE):
+            complete = chain_indices.size
+        else:
+            first = max(self._chain_indices.size - 1, 0)
+            gaps = np.flatnonzero(
+                np.diff(chain_indices[first:]) >= PEAK_DISTANCE)
+            complete = first + int(gaps[-1]) + 1 if gaps.size > 0 else 0
+
+        peaks = chain_indices[:complete][select_by_peak_distance(
+            chain_indices[:complete], chain_values[:complete])]
+        # peaks before the tape start are dropped
+        if self._start is None:
+            peaks = peaks[:0]
+        else:
+            peaks = peaks[peaks >= self._start]
+        self._peaks = np.concatenate((self._peaks, peaks))
+        self._chain_indices = chain_indices[complete:]
+        self._chain_values = chain_values[complete:]
+
+    def _peak_levels(self, peak_positions: np.ndarray,
+                     final: bool) -> tuple[np.ndarray, np.ndarray]:
+        levels = np.full(peak_positions.size, float(self.expected_average))
+        resolved = np.ones(peak_positions.size, dtype=bool)
+        if not self.use_true_baseline:
+            return levels, resolved
+
+        # set level to average value of the completed piece at the position
+        pieces = (self.baseline if self.baseline is not None else
+                  self._completed_pieces(float(peak_positions[0])))
+        found = pieces.locate(peak_positions)
+        levels[found >= 0] = pieces.value[found[found >= 0]]
+        if not final and self.baseline is None:
+            completed_end = (self.averages[-1].end_position if self.averages
+                             else -np.inf)
+            resolved = peak_positions < completed_end
+
+        return levels, resolved
+
+    def _completed_pieces(self, first_position: float
+                          ) -> QualityParameterArray:
+        # Adds the pieces completed since the last call and drops the ones
+        # ending before first_position, as the peaks are handled in order.
+        new = QualityParameterArray.from_infos(
+            AveragesInfo, self.averages[self._pieces_added:])
+        self._pieces_added = len(self.averages)
+        parts = [part[int(np.searchsorted(part.end_position, first_position,
+                                          side='right')):]
+                 for part in (self._pieces, new)]
+        self._pieces = QualityParameterArray(
+            AveragesInfo,
+            *(np.concatenate([getattr(part, name) for part in parts])
+              for name in ('p_id', 'start_position', 'end_position',
+                           'value')))
+        return self._pieces
+
+    def _add_peaks(self, selected: np.ndarray, start_positions: np.ndarray,
+                   end_positions: np.ndarray, peak_positions: np.ndarray,
+                   peak_values: np.ndarray) -> None:
+        if selected.size == 0:
+            return
+        # merge peaks with the same width into the lowest one, which may
+        # replace the last drop-out found so far
+        last_peak = self._last_peak
+        replacement, kept = merge_duplicate_peaks(
+            start_positions[selected], end_positions[selected],
+            peak_values[selected], self.pos_tol,
+            (last_peak.start_position, last_peak.end_position,
+             last_peak.value))
+
+        def make_peak(index: int) -> PeakInfo:
+            i = int(selected[index])
+            return PeakInfo(p_id=self._p_id + i,
+                            start_position=float(start_positions[i]),
+                            end_position=float(end_positions[i]),
+                            center_position=float(peak_positions[i]),
+                            value=float(peak_values[i]))
+
+        if replacement >= 0:
+            if self.dropouts:
+                self.dropouts[-1] = make_peak(replacement)
+            else:
+                self.dropouts.append(make_peak(replacement))
+        self.dropouts.extend(make_peak(index) for index in kept.tolist())
+        if self.dropouts:
+            self._last_peak = self.dropouts[-1]
+
+    def _trim(self, chunk_index: int) -> None:
+        # Drop samples that are no longer needed. Peaks that are not handled
+        # yet need their context and a history back to the last value above
+        # any baseline for their left edges. The history is limited to
+        # max_history samples before the latest chunk.
+        # samples from the first peak or candidate on the tape that is not
+        # handled yet are kept, and the samples still to be searched
+        first_unhandled = [self._scan_from]
+        if self._peaks.size > 0:
+            first_unhandled.append(int(self._peaks[0]))
+        if self._start is not None:
+            chain = np.searchsorted(self._chain_indices, self._start)
+            first_unhandled.extend(self._chain_indices[chain:chain + 1].tolist())
+        pending = min(first_unhandled) - self._offset
+
+        cap = self.expected_average
+        if self.use_true_baseline:
+            cap = max(cap, self._max_average)
+        if cap != self._cap:
+            self._cap = cap
+            self._cap_scanned = self._offset
+            self._last_above_cap = -1
+        # only search the samples not searched before
+        scan_from = max(self._cap_scanned - self._offset, 0)
+        if pending > scan_from:
+            above = np.flatnonzero(self._values[scan_from:pending] > cap)
+            if above.size > 0:
+                self._last_above_cap = self._offset + scan_from + int(above[-1])
+            self._cap_scanned = self._offset + pending
+
+        keep_from = max(self._last_above_cap - self._offset, 0)
+        keep_from = max(keep_from,
+                        chunk_index - self._offset - self.max_history)
+        keep_from = min(keep_from, pending)
+        if self._start is not None:
+            keep_from = min(keep_from, self._committed - self._offset)
+        if keep_from > 0:
+            self._buffer.discard(keep_from)
+
+        if (chunk_index - self._offset > self.max_history
+                or self._chain_indices.size > self.max_history):
+            raise ValueError(
+                "More than max_history samples have to be kept, e.g. for a "
+                "long section below the threshold, a long chain of peaks or "
+                "for drop-outs waiting for the baseline of the whole tape.")
+
+
+def assess_streaming(from_path: str,
+                     tape_id: str,
+                     tape_specs: TapeSpecs,
+                     expected_average: float,
+                     chunk_size: int = 1_000_000,
+                     convert_to_meters: Optional[bool] = False
+                     ) -> TapeQualityAssessor:
+    """ Assesses a tape from a TapeStar file read in chunks, so that memory
+        use is bounded by the chunk size instead of the tape length.
+
+    The returned assessor holds the quality reports and OK tape sections.
+    As the data is not kept, it can't plot the data or save a PDF report.
+    If drop-out widths are determined relative to the average of the whole
+    tape, the file is read twice: first for the average, then for the
+    drop-outs. Files with descending positions can't be streamed.
+
+    Args:
+        from_path (str): Path of csv-file to be assessed.
+        tape_id (str): ID of the HTS tape.
+        tape_specs (TapeSpecs): Product definition to assess the tape against.
+        expected_average (float): Approximate average critical current.
+        chunk_size (int, optional): Number of rows per chunk.
+            Defaults to 1_000_000.
+        convert_to_meters (bool, optional): Convert postions from mm to
+            meters. If None, guess from the first chunk. Defaults to False.
+
+    Raises:
+        ValueError: Raised if the specs require moving averages or the
+            positions are descending.
+
+    Returns:
+        TapeQualityAssessor: Assessor holding reports and OK tape sections.
+    """
+    _check_streaming_specs(tape_specs)
+    baseline = None
+    if _needs_whole_tape_baseline(tape_specs):
+        first_pass = StreamingTapeAnalyzer(tape_id, expected_average, None,
+                                           False, max_history=chunk_size)
+        for positions, values in load_data_chunks(from_path, chunk_size,
+                                                  convert_to_meters):
+            first_pass.update(positions, values)
+        first_pass.finish()
+        baseline = first_pass.averages
+
+    analyzer = StreamingTapeAnalyzer(tape_id, expected_average,
+                                     tape_specs.averaging_length,
+                                     tape_specs.width_from_true_baseline,
+                                     max_history=chunk_size,
+                                     baseline=baseline)
+    for positions, values in load_data_chunks(from_path, chunk_size,
+                                              convert_to_meters):
+        analyzer.update(positions, values)
+    analyzer.finish()
+
+    assessor = TapeQualityAssessor(analyzer, tape_specs)  # type: ignore
+    assessor.evaluate_specs()
+    assessor.determine_ok_tape_section(tape_specs.min_tape_length)
+    return assessor
+
+
+def _check_streaming_specs(tape_specs: TapeSpecs) -> None:
+    if tape_specs.averaging_step is not None:
+        raise ValueError("Moving averages are not supported for streaming.")
+
+
+def _needs_whole_tape_baseline(tape_specs: TapeSpecs) -> bool:
+    # drop-out widths relative to the average of the whole tape, which is
+    # only known at its end
+    return (tape_specs.width_from_true_baseline
+            and tape_specs.averaging_length is None)
+
+
+class TapeFileFollower:
+    """ Reads the rows appended to a TapeStar export that is still being
+        written. Each read only parses the bytes added since the last read.
+    """
+    def __init__(self, from_path: str,
+                 convert_to_meters: Optional[bool] = False) -> None:
+        """
+        Args:
+            from_path (str): Path of the growing csv-file.
+            convert_to_meters (bool, optional): Convert postions from mm to
+                meters. If None, guess from the first rows read.
+                Defaults to False.
+        """
+        self.from_path = from_path
+        self.convert_to_meters = convert_to_meters
+        self._offset = 0
+        self._rest = b''
+        self._header_lines = 2
+
+    @property
+    def size(self) -> int:
+        """ Number of bytes read so far. """
+        return self._offset
+
+    def read_new_rows(
+            self, final: bool = False) -> tuple[np.ndarray, np.ndarray]:
+        """ Reads all complete rows appended since the last call.
+
+        Args:
+            final (bool, optional): Also read a last row without line break.
+                Defaults to False.
+
+        Raises:
+            ValueError: Raised if the file got shorter.
+
+        Returns:
+            tuple[NDArray, NDArray]: Positions and critical currents of the
+                new rows.
+        """
+        empty = (np.empty(0), np.empty(0))
+        if not os.path.isfile(self.from_path):
+            return empty
+        with open(self.from_path, 'rb') as file:
+            if os.fstat(file.fileno()).st_size < self._offset:
+                raise ValueError(f"File {self.from_path} got truncated.")
+            file.seek(self._offset)
+            appended = file.read()
+        self._offset += len(appended)
+
+        content = self._rest + appended
+        end = len(content) if final else content.rfind(b'\n') + 1
+        content, self._rest = content[:end], content[end:]
+        while self._header_lines > 0 and content:
+            line_end = content.find(b'\n')
+            content = content[line_end + 1:] if line_end >= 0 else b''
+            self._header_lines -= 1
+        if not content.strip():
+            return empty
+
+        rows = read_csv(BytesIO(content), header=None, delimiter="\t")
+        positions = rows.iloc[:, 0].to_numpy(dtype=np.float64)
+
+        # convert to meters if number of data points is close to length
+        if self.convert_to_meters is None and positions.size > 1:
+            length = abs(positions[-1] - positions[0])
+            self.convert_to_meters = positions.size/length < 10
+
+        if self.convert_to_meters:
+            positions = positions / 1000.0
+        return positions, rows.iloc[:, 1].to_numpy(dtype=np.float64)
+
+
+class LiveTapeAssessor:
+    """ Assesses a TapeStar measurement while the export is still being
+        written, so that failures are reported as soon as a piece or a
+        drop-out is complete.
+
+    The cost of each poll is proportional to the appended data and the data
+    of drop-outs that are not resolved yet, up to about two piece lengths
+    with width_from_true_baseline. Specs with drop-out widths relative to
+    the average of the whole tape can't be assessed live.
+    """
+    def __init__(self,
+                 from_path: str,
+                 tape_id: str,
+                 tape_specs: TapeSpecs,
+                 expected_average: float,
+                 convert_to_meters: Optional[bool] = False) -> None:
+        _check_streaming_specs(tape_specs)
+        if _needs_whole_tape_baseline(tape_specs):
+            raise ValueError("Drop-outs relative to the average of the whole "
+                             "tape can't be assessed live.")
+        self.tape_specs = tape_specs
+        self.follower = TapeFileFollower(from_path, convert_to_meters)
+        self.analyzer = StreamingTapeAnalyzer(
+            tape_id, expected_average, tape_specs.averaging_length,
+            tape_specs.width_from_true_baseline)
+        self.quality_reports: list[QualityReport] = []
+
+    def poll(self) -> list[QualityReport]:
+        """ Reads the appended rows and assesses all completed results.
+
+        Returns:
+            list[QualityReport]: Reports with the new fails, one per failed
+                test type.
+        """
+        positions, values = self.follower.read_new_rows()
+        return self._evaluate(self.analyzer.update(positions, values))
+
+    def finish(self) -> list[QualityReport]:
+        """ Reads the rest of the file and completes the assessment.
+
+        Returns:
+            list[QualityReport]: Reports with the new fails, one per failed
+                test type.
+        """
+        positions, values = self.follower.read_new_rows(final=True)
+        reports = self._evaluate(self.analyzer.update(positions, values))
+        return reports + self._evaluate(self.analyzer.finish())
+
+    def follow(self, poll_interval: float = 1.0,
+               idle_timeout: float = 60.0) -> Iterator[QualityReport]:
+        """ Polls the file until it has not grown for idle_timeout seconds and
+            finishes the assessment.
+
+        Args:
+            poll_interval (float, optional): Seconds between polls.
+                Defaults to 1.0.
+            idle_timeout (float, optional): Seconds without new data after
+                which the measurement is considered complete.
+                Defaults to 60.0.
+
+        Yields:
+            QualityReport: Reports with new fails as soon as they are found.
+        """
+        last_change = time.monotonic()
+        while time.monotonic() - last_change < idle_timeout:
+            size = self.follower.size
+            yield from self.poll()
+            if self.follower.size != size:
+                last_change = time.monotonic()
+            time.sleep(poll_interval)
+        yield from self.finish()
+
+    def _evaluate(self, update: StreamingUpdate) -> list[QualityReport]:
+        tape_id = self.analyzer.tape_id
+        reports = []
+        if self.tape_specs.min_average is not None:
+            reports.append(QualityReport(
+                tape_id, TestType.AVERAGE,
+                average_fails(update.averages, self.tape_specs)))  # type: ignore
+
+        if (self.tape_specs.dropout_value is None
+                or self.tape_specs.dropout_func is None):
+            reports.append(QualityReport(
+                tape_id, TestType.MINIMUM,
+                min_value_fails(update.dropouts, self.tape_specs)))  # type: ignore
+        else:
+            reports.append(QualityReport(
+                tape_id, TestType.DROPOUT,
+                dropout_fails(update.dropouts, self.tape_specs)))  # type: ignore
+
+        reports = [report for report in reports if not report.passed]
+        self.quality_reports.extend(reports)
+        return reports
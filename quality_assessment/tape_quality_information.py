@@ -1,14 +1,25 @@
 """ Class implementation for TapeQualityInformation
 """
 
-from typing import Optional
+from typing import Any, Optional
+from copy import copy
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, field
-from math import isclose
+from functools import cached_property
+import numpy as np
+from numpy.typing import NDArray
 from pandas import DataFrame
 from scipy.signal import find_peaks
-from scipy.interpolate import interp1d
-from .data_types import (QualityParameterInfo, PeakInfo, AveragesInfo,
+from .data_types import (PeakInfo, AveragesInfo, QualityParameterArray,
                          TapeSection, ScatterInfo, TestType)
+from .drop_out_analysis import (half_max_positions, merge_duplicate_peaks,
+                                select_by_peak_distance)
+from .parallel_analysis import (parallel_half_max_positions,
+                                parallel_peak_candidates,
+                                parallel_piecewise_statistics)
+from .piecewise_statistics import (PieceStatistics, moving_statistics,
+                                   piece_boundaries, piecewise_statistics)
+from .tape_trace import TapeTrace, TraceData
 
 
 @dataclass
@@ -17,42 +28,72 @@ class TapeQualityInformation:
 
     Attributes:
     -----------
-    data : DataFrame
-        Critical current vs. position data of a HTS tape.
+    data : TraceData
+        Critical current vs. position data of a HTS tape. Either a DataFrame
+        (first column positions, second column values), a pair of position
+        and value arrays, an array of shape (n, 2) (e.g. memory-mapped) or a
+        TapeTrace (e.g. from shared memory). Replaced by its trace on
+        assignment, so that no other copy of the data is kept.
     tape_id: str
         ID of the HTS tape
     expected_average : float
         Approximate average critical current. Used for drop-out detection and
         piecewise average calculation.
-    averages : list[AveragesInfo] = []
+    averages : QualityParameterArray = QualityParameterArray(AveragesInfo)
         Piecewise averages.
-    scattering: list[ScatterInfo] = []
+    scattering: QualityParameterArray = QualityParameterArray(ScatterInfo)
         Piecewise scattering info (standard deviation).
-    dropouts : list[PeakInfo] = []
+    dropouts : QualityParameterArray = QualityParameterArray(PeakInfo)
         Information about all drop-outs.
+    moving_averages : QualityParameterArray = QualityParameterArray(AveragesInfo)
+        Averages over overlapping windows moved along the tape.
+    trace : TapeTrace
+        Positions and values as contiguous arrays used for all calculations,
+        the same object as data.
+    tape_section : TapeSection
+        Section between the first and last value above the peak definition.
+        Cached; recalculated when data or expected_average is reassigned.
 
     Methods:
     --------
     calculate_statistics(TestType) -> list[QualitityParameterInfo]
         Calculates piecewise statistics info.
+    calculate_piecewise_statistics(float) -> None
+        Calculates piecewise averages and scattering in one pass.
+    calculate_moving_statistics(float, float) -> None
+        Calculates averages over windows moved along the tape.
     calculate_drop_out_info() -> list[QualitityParameterInfo]
         Calculate drop-out information.
+    copy() -> TapeQualityInformation
+        Shallow copy sharing data and calculated results.
+
+    Results are cached per calculation and parameters, so repeating a
+    calculation (e.g. for another product) only reassigns the attributes.
     """
-    data: DataFrame
+    data: TraceData
     tape_id: str
 
     expected_average: float
 
     # TODO make following attributes read-only
-    averages: list[AveragesInfo] = field(default_factory=list)
-    scattering: list[ScatterInfo] = field(default_factory=list)
-    dropouts: list[PeakInfo] = field(default_factory=list)
+    averages: QualityParameterArray = field(
+        default_factory=lambda: QualityParameterArray(AveragesInfo))
+    scattering: QualityParameterArray = field(
+        default_factory=lambda: QualityParameterArray(ScatterInfo))
+    dropouts: QualityParameterArray = field(
+        default_factory=lambda: QualityParameterArray(PeakInfo))
+    moving_averages: QualityParameterArray = field(
+        default_factory=lambda: QualityParameterArray(AveragesInfo))
+
+    @property
+    def trace(self) -> TapeTrace:
+        return self.data
 
     @property
     def tape_section(self) -> TapeSection:
-        start, end = self._find_start_end_index(self.data)
-        start_pos = self.data.iloc[:, 0].values[start]
-        end_pos = self.data.iloc[:, 0].values[end]
+        start, end = self._start_end_index
+        start_pos = float(self.trace.positions[start])
+        end_pos = float(self.trace.positions[end])
         return TapeSection(start_pos, end_pos)
 
     @property
@@ -60,15 +101,38 @@ class TapeQualityInformation:
         return self.expected_average * 0.8
 
     def __post_init__(self):
-        if not isinstance(self.data, DataFrame) or self.data is None:
+        if not isinstance(self.data,
+                          (DataFrame, tuple, np.ndarray, TapeTrace)):
             raise TypeError("Wrong data type for data.")
         if self.expected_average is None:
             raise ValueError("Property expected_average not set")
 
-        # reverse order of dataframe if end position is smaller than start
-        # position.
-        if self.data.iloc[:, 0].values[0] > self.data.iloc[:, 0].values[-1]:
-            self.data = self.data.iloc[::-1].reset_index(drop=True)
+        # only keep the trace (sorted by ascending position), so that the
+        # loaded data can be freed
+        self.data = TapeTrace.from_data(self.data)
+
+    def __setattr__(self, name, value):
+        if name == 'data' and 'expected_average' in self.__dict__:
+            value = TapeTrace.from_data(value)
+        super().__setattr__(name, value)
+        # drop cached values derived from the changed attribute
+        if name in ('data', 'expected_average'):
+            self.__dict__.pop('_start_end_index', None)
+            self.__dict__.pop('_results', None)
+        if name == 'averages':
+            self.__dict__.pop('_averages_key', None)
+
+    def copy(self) -> 'TapeQualityInformation':
+        """ Creates a shallow copy that shares the data, the trace and all
+            results calculated so far (and later) with this object, but has
+            its own averages, scattering and drop-outs. Used to assess one
+            tape against several products.
+
+        Returns:
+            TapeQualityInformation: Copy sharing the calculated results.
+        """
+        _ = self._results
+        return copy(self)
 
     def calculate_statisitcs(self, p_type: TestType,
                              piece_length: Optional[float]) -> None:
@@ -79,150 +143,207 @@ class TapeQualityInformation:
             piece_length (float, optional): piece length over which to
                 calculate the parameter. If None, use the whole length.
         """
-        start_index, end_index = self._find_start_end_index(self.data)
-        length = piece_length
-
-        # if piece_length is not set, average over the whole length
-        if piece_length is None or piece_length == 0.0:
-            length = (self.data.iloc[:, 0].values[end_index] -
-                      self.data.iloc[:, 0].values[start_index])
-
-        next_position = (self.data.iloc[:, 0].values[start_index] + length)
-        last_index = start_index
-        piece = 0
-        info_list = []
-
-        # Calculate scattering and store them in ScatterInfo instance
-        while next_position < self.data.iloc[end_index, 0]:
-            next_index = self.data.index[
-                self.data.iloc[:, 0] > next_position].to_list()[0]
-            info = self._get_quality_parameter_info(
-                piece, last_index, next_index, p_type)
-            info_list.append(info)
-            last_index = next_index
-            next_position += length
-            piece += 1
-
-        # append scattering till end of tape
-        info = self._get_quality_parameter_info(
-            piece, last_index, end_index, p_type)
-
-        info_list.append(info)
+        averages, scattering = self._piecewise_results(piece_length)
         if p_type == TestType.AVERAGE:
-            self.averages = info_list
+            self.averages = averages
+            self._averages_key = ('piecewise', piece_length)
         elif p_type == TestType.SCATTER:
-            self.scattering = info_list
+            self.scattering = scattering
+
+    def calculate_piecewise_statistics(self,
+                                       piece_length: Optional[float],
+                                       workers: int = 1) -> None:
+        """ Calculates piecewise averages and scattering together, sharing
+            the piece boundaries and a single pass over the data.
+
+        Args:
+            piece_length (float, optional): piece length over which to
+                calculate the parameters. If None, use the whole length.
+            workers (int, optional): Number of threads calculating groups of
+                pieces in parallel. Defaults to 1.
+        """
+        self.averages, self.scattering = self._piecewise_results(
+            piece_length, workers)
+        self._averages_key = ('piecewise', piece_length)
+
+    def calculate_moving_statistics(self, window_length: Optional[float],
+                                    step: float) -> None:
+        """ Calculates averages over windows of fixed length that are moved
+            along the tape in steps. Unlike piecewise averages, a weak
+            stretch is not split up by where the piece boundaries fall.
+
+        Args:
+            window_length (float, optional): Length of the windows. If None,
+                use the whole length.
+            step (float): Distance between the starts of two windows.
+        """
+        key = ('moving', window_length, step)
+        if key not in self._results:
+            start_index, end_index = self._start_end_index
+            statistics = moving_statistics(self.trace.positions,
+                                           self.trace.values, start_index,
+                                           end_index, window_length, step)
+            self._results[key] = self._get_quality_parameter_infos(
+                AveragesInfo, statistics, statistics.mean)
+        self.moving_averages = self._results[key]
 
     def calculate_drop_out_info(self,
                                 use_true_baseline: bool,
-                                pos_tol: float = 2e-3) -> None:
+                                pos_tol: float = 2e-3,
+                                workers: int = 1) -> None:
         """ Calculate drop-out information.
 
         Args:
             use_true_baseline (bool): Use calculated or expected average as baseline.
             pos_tol (float): Tolerance for position to be identified as the same.
+            workers (int, optional): Number of threads searching segments of
+                the tape and measuring the widths of groups of drop-outs in
+                parallel (see parallel_analysis). Defaults to 1.
         """
-        start_index, end_index = self._find_start_end_index(self.data)
-        indices, _ = find_peaks(-self.data.iloc[:, 1],
-                                height=(-self._peak_definition, 0),
-                                distance=10)
-
-        # Remove all drop-outs not on the actual tape
-        indices = list(filter(lambda x: x >= start_index, indices))
-        indices = list(filter(lambda x: x <= end_index, indices))
-
-        peak_info_list: list[PeakInfo] = []
-        last_peak = PeakInfo()
-        for i, index in enumerate(indices):
-            position = self.data.iloc[index, 0]
-            value = self.data.iloc[index, 1]
-            level = self.expected_average
-            # set level to average value at the peak position
-            if use_true_baseline and self.averages is not None:
-                for average in self.averages:
-                    if (position > average.start_position
-                            and position < average.end_position):
-                        level = average.value
-                        break
-
-            half_max = (value + level) / 2.0
-            if half_max > level:
-                continue
-
-            start_position = self._find_half_max_position(index, half_max, False)
-            end_position = self._find_half_max_position(index, half_max, True)
-
-            current_peak = PeakInfo(p_id=i,
-                                    start_position=start_position,
-                                    end_position=end_position,
-                                    center_position=position,
-                                    value=value)
-
-            # check if width is the same. if value smaler than before, remove
-            # last entry and replace by new entry. Add new entry, if not the
-            # same width (tolerance is 2mm -> might be tweaked a bit)
-            if (isclose(start_position, last_peak.start_position, abs_tol=pos_tol)
-                    and isclose(end_position, last_peak.end_position, abs_tol=pos_tol)):
-                if value < last_peak.value:
-                    peak_info_list.remove(last_peak)
-                    peak_info_list.append(current_peak)
-                    last_peak = current_peak
+        if not use_true_baseline:
+            key = ('dropouts', pos_tol, None)
+            baseline = None
+        elif '_averages_key' in self.__dict__:
+            # the drop-outs depend on the piece length of the averages used
+            # as baseline, taken from the same cached piecewise results
+            key = ('dropouts', pos_tol, self._averages_key)
+            baseline = self._piecewise_results(self._averages_key[1])[0]
+        else:
+            # averages assigned from outside, nothing to key them on, and
+            # possibly a plain list of AveragesInfo
+            baseline = self.averages
+            if baseline is not None and not isinstance(
+                    baseline, QualityParameterArray):
+                baseline = QualityParameterArray.from_infos(AveragesInfo,
+                                                            baseline)
+            self.dropouts = self._drop_out_info(baseline, pos_tol, workers)
+            return
+        if key not in self._results:
+            self._results[key] = self._drop_out_info(baseline, pos_tol,
+                                                     workers)
+        self.dropouts = self._results[key]
+
+    def _drop_out_info(self, baseline: Optional[QualityParameterArray],
+                       pos_tol: float, workers: int) -> QualityParameterArray:
+        positions = self.trace.positions
+        values = self.trace.values
+        indices = self._peak_indices(workers)
+        p_ids = np.arange(indices.size)
+        peak_positions = positions[indices]
+        peak_values = values[indices]
+
+        levels = np.full(indices.size, float(self.expected_average))
+        # set level to average value at the peak position
+        if baseline is not None:
+            pieces = baseline.locate(peak_positions)
+            found = pieces >= 0
+            levels[found] = baseline.value[pieces[found]]
+
+        half_max = (peak_values + levels) / 2.0
+        keep = ~(half_max > levels)
+        p_ids, indices, half_max = p_ids[keep], indices[keep], half_max[keep]
+        if workers > 1:
+            with ThreadPoolExecutor(workers) as executor:
+                start_positions, end_positions = parallel_half_max_positions(
+                    positions, values, indices, half_max, executor, workers)
+        else:
+            start_positions, end_positions = half_max_positions(
+                positions, values, indices, half_max)
+
+        peak_values = peak_values[keep]
+        # merge peaks with the same width (tolerance is 2mm -> might be
+        # tweaked a bit), keeping the lowest one
+        replacement, kept = merge_duplicate_peaks(start_positions,
+                                                  end_positions, peak_values,
+                                                  pos_tol)
+        if replacement >= 0:
+            kept = np.concatenate(([replacement], kept))
+
+        return QualityParameterArray(PeakInfo,
+                                     p_id=p_ids[kept],
+                                     start_position=start_positions[kept],
+                                     end_position=end_positions[kept],
+                                     value=peak_values[kept],
+                                     center_position=peak_positions[keep][kept])
+
+    def _peak_indices(self, workers: int = 1) -> NDArray[np.intp]:
+        # the distance criterion is applied by select_by_peak_distance to
+        # all candidates, like the StreamingTapeAnalyzer does per chain
+        if ('peaks',) not in self._results:
+            start_index, end_index = self._start_end_index
+            values = self.trace.values
+            if workers > 1:
+                with ThreadPoolExecutor(workers) as executor:
+                    indices = parallel_peak_candidates(values, start_index,
+                                                       end_index,
+                                                       self._peak_definition,
+                                                       executor, workers)
             else:
-                peak_info_list.append(current_peak)
-                last_peak = current_peak
-
-        self.dropouts = peak_info_list
-
-    def _get_quality_parameter_info(
-            self, piece: int, start_index: int, end_index: int,
-            q_parameter: TestType) -> Optional[QualityParameterInfo]:
-        start_position = self.data.iloc[start_index, 0]
-        end_position = self.data.iloc[end_index, 0]
-
-        p_value = 0.0
-        p_info = None
-        if q_parameter == TestType.AVERAGE:
-            p_value = self.data.iloc[start_index:end_index, 1].mean()
-            p_info = AveragesInfo(p_id=piece,
-                                  start_position=start_position,
-                                  end_position=end_position,
-                                  value=p_value)
-        elif q_parameter == TestType.SCATTER:
-            p_value = self.data.iloc[start_index:end_index, 1].std()
-            p_info = ScatterInfo(p_id=piece,
-                                 start_position=start_position,
-                                 end_position=end_position,
-                                 value=p_value)
-
-        return p_info
-
-    def _find_half_max_position(self, peak_index: int, half_max: float,
-                                go_up: bool) -> float:
-        half_max_position = 0.0
-        last_index = len(self.data.index) - 1
-        step = 1
-        if not go_up:
-            last_index = 0
-            step = -1
-
-        half_max_position = self.data.iloc[last_index, 0]
-        for j in range(peak_index, last_index, step):
-            if self.data.iloc[j, 1] > half_max:
-                x_values = [self.data.iloc[j, 0], self.data.iloc[j-step, 0]]
-                y_values = [self.data.iloc[j, 1], self.data.iloc[j-step, 1]]
-                f_of_y = interp1d(y_values, x_values)
-                half_max_position = f_of_y(half_max)[()]
-                break
-
-        return half_max_position  # type: ignore
-
-    def _find_start_end_index(self, data: DataFrame) -> tuple[int, int]:
+                indices, _ = find_peaks(-values,
+                                        height=(-self._peak_definition, 0))
+            indices = indices[select_by_peak_distance(indices,
+                                                      values[indices])]
+
+            # Remove all drop-outs not on the actual tape
+            indices = indices[(indices >= start_index)
+                              & (indices <= end_index)]
+            self._results[('peaks',)] = indices
+        return self._results[('peaks',)]
+
+    def _piecewise_results(
+            self, piece_length: Optional[float], workers: int = 1
+    ) -> tuple[QualityParameterArray, QualityParameterArray]:
+        key = ('piecewise', piece_length)
+        if key not in self._results:
+            statistics = self._piece_statistics(piece_length, workers)
+            self._results[key] = (
+                self._get_quality_parameter_infos(AveragesInfo, statistics,
+                                                  statistics.mean),
+                self._get_quality_parameter_infos(ScatterInfo, statistics,
+                                                  statistics.std))
+        return self._results[key]
+
+    def _piece_statistics(self, piece_length: Optional[float],
+                          workers: int = 1) -> PieceStatistics:
+        start_index, end_index = self._start_end_index
+        bounds = piece_boundaries(self.trace.positions, start_index,
+                                  end_index, piece_length)
+
+        if workers > 1:
+            with ThreadPoolExecutor(workers) as executor:
+                return parallel_piecewise_statistics(self.trace.positions,
+                                                     self.trace.values,
+                                                     bounds, executor,
+                                                     workers)
+        return piecewise_statistics(self.trace.positions, self.trace.values,
+                                    bounds)
+
+    @staticmethod
+    def _get_quality_parameter_infos(
+            info_type: type, statistics: PieceStatistics,
+            p_values: NDArray[np.float64]) -> QualityParameterArray:
+        return QualityParameterArray(info_type,
+                                     p_id=np.arange(p_values.size),
+                                     start_position=statistics.start_positions,
+                                     end_position=statistics.end_positions,
+                                     value=p_values)
+
+    @cached_property
+    def _results(self) -> dict[tuple, Any]:
+        # results by calculation and parameters, shared with copies
+        return {}
+
+    @cached_property
+    def _start_end_index(self) -> tuple[int, int]:
         threshold = self.expected_average * 0.8
 
         # Find start and end of tape -> where Ic is greater threshold
         # the first time and last time, respectively.
-        above_threshold_list = data.index[data.iloc[:, 1] > threshold].to_list()
-        start_index = above_threshold_list[0]
-        end_index = above_threshold_list[-1]
+        above_threshold = self.trace.values > threshold
+        start_index = int(np.argmax(above_threshold))
+        if not above_threshold[start_index]:
+            raise ValueError("No values above threshold, tape not found.")
+        end_index = above_threshold.size - 1 - int(
+            np.argmax(above_threshold[::-1]))
 
         return start_index, end_index
@@ -0,0 +1,72 @@
+""" Class implementation for TapeTrace
+"""
+from typing import Union
+from dataclasses import dataclass
+import numpy as np
+from numpy.typing import ArrayLike, NDArray
+from pandas import DataFrame
+
+TraceData = Union[DataFrame, tuple[ArrayLike, ArrayLike], NDArray,
+                  'TapeTrace']
+
+
+@dataclass(frozen=True)
+class TapeTrace:
+    """ Critical current vs. position trace of a HTS tape held in contiguous
+        float64 arrays sorted by ascending position.
+
+    Attributes:
+    -----------
+        positions (NDArray): Positions along the tape in m.
+        values (NDArray): Critical current at the positions in A.
+    """
+    positions: NDArray[np.float64]
+    values: NDArray[np.float64]
+
+    def __len__(self) -> int:
+        return self.positions.size
+
+    @classmethod
+    def from_data(cls, data: TraceData) -> 'TapeTrace':
+        """ Creates a trace from a DataFrame (first column positions, second
+            column values), a pair of position and value arrays, or an array
+            of shape (n, 2). Contiguous float64 columns (e.g. the memory
+            maps of the load_data cache) are used without copying, a
+            TapeTrace is used as it is. The strided columns of a C-ordered
+            (n, 2) array and descending data are copied.
+
+        Args:
+            data (TraceData): Critical current vs. position data.
+
+        Raises:
+            TypeError: Raised if data is not of a supported type.
+            ValueError: Raised if positions and values differ in length.
+
+        Returns:
+            TapeTrace: Trace sorted by ascending position.
+        """
+        if isinstance(data, TapeTrace):
+            return data
+        if isinstance(data, DataFrame):
+            positions = data.iloc[:, 0].to_numpy(dtype=np.float64)
+            values = data.iloc[:, 1].to_numpy(dtype=np.float64)
+        elif isinstance(data, tuple) and len(data) == 2:
+            positions, values = data
+        elif isinstance(data, np.ndarray) and data.ndim == 2 and data.shape[1] == 2:
+            positions, values = data[:, 0], data[:, 1]
+        else:
+            raise TypeError("Wrong data type for data.")
+
+        positions = np.asarray(positions, dtype=np.float64)
+        values = np.asarray(values, dtype=np.float64)
+        if positions.shape != values.shape or positions.ndim != 1:
+            raise ValueError("Positions and values must be 1d arrays of "
+                             "the same length.")
+
+        # reverse order if end position is smaller than start position.
+        if positions.size > 0 and positions[0] > positions[-1]:
+            positions = positions[::-1]
+            values = values[::-1]
+
+        return cls(np.ascontiguousarray(positions),
+                   np.ascontiguousarray(values))
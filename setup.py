@@ -37,4 +37,7 @@ setup(name="Quality Assessment",
           "Topic :: Utilities",
           "License :: OSI Approved :: BSD License",
       ],
-      install_requires=['matplotlib', 'numpy', 'pandas', 'fpdf2', 'scipy'])
+      # DefectReportPDF fills the image cache of fpdf2, which is not part of
+      # its public interface
+      install_requires=['matplotlib', 'numpy', 'pandas', 'fpdf2>=2.8,<2.9',
+                        'scipy'])
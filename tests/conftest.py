@@ -0,0 +1,48 @@
+""" Helpers shared by the tests: synthetic tape data and TapeStar exports
+"""
+import numpy as np
+
+TAPESTAR_HEADER = "TapeStar export\nPosition\tIc\n"
+
+
+def tapestar_rows(positions, values):
+    """ Rows of a TapeStar export, each ending with a line break. """
+    return [f"{position!r}\t{value!r}\n"
+            for position, value in zip(np.asarray(positions, float).tolist(),
+                                       np.asarray(values, float).tolist())]
+
+
+def write_tapestar_export(path, positions, values):
+    """ Writes positions and values as a TapeStar export. """
+    path.write_text(TAPESTAR_HEADER +
+                    "".join(tapestar_rows(positions, values)))
+
+
+def tape_with_dips(size, centers, depths, width, seed):
+    """ Tape of 150 A with noise and Gaussian dips, with 100 samples below
+        the tape threshold at both ends, sampled every mm.
+    """
+    rng = np.random.default_rng(seed)
+    positions = np.arange(size) * 1e-3
+    values = 150.0 + rng.normal(0.0, 2.0, size)
+    for center, depth in zip(centers, depths):
+        window = np.arange(center - 4 * width, center + 4 * width)
+        values[window] -= depth * np.exp(-((window - center) / width)**2)
+    values[:100] = 1.0
+    values[-100:] = 1.0
+    return positions, values
+
+
+def tape_with_peak_chains(size=20000):
+    """ Tape with sections of dense sub-threshold peaks closer than
+        PEAK_DISTANCE, which find_peaks' distance criterion chains over the
+        whole section, separated by short sections above the threshold.
+    """
+    positions = np.arange(size) * 1e-3
+    values = np.full(size, 150.0)
+    values[200:size - 200] = 60.0 + 10.0 * np.arange(size - 400) % 7
+    for start in range(3000, size - 3000, 3000):
+        values[start:start + 50] = 150.0
+    values[:100] = 1.0
+    values[-100:] = 1.0
+    return positions, values
@@ -0,0 +1,61 @@
+import numpy as np
+from quality_assessment.batch_report import (batch_report_html,
+                                             save_batch_report,
+                                             sparkline_svg)
+from quality_assessment.batch_runner import TapeSummary
+from quality_assessment.data_types import TapeSection
+from quality_assessment.products import TapeProduct
+from quality_assessment.quality_assessor import TapeQualityAssessor
+from quality_assessment.tape_quality_information import TapeQualityInformation
+
+
+def test_summary_keeps_minima_of_tape_section_as_sparkline():
+    positions = np.arange(0.0, 60.0, 0.01)
+    values = np.full(positions.size, 700.0)
+    values[:100] = 1.0
+    values[3000:3003] = 100.0
+    info = TapeQualityInformation((positions, values), "ID", 700.0)
+    assessor = TapeQualityAssessor(info, TapeProduct.STANDARD3.value)
+    assessor.assess_meets_specs()
+
+    summary = TapeSummary.from_assessor(assessor, "ID.dat")
+
+    assert len(summary.sparkline) == 120
+    assert min(summary.sparkline) == 100.0
+    assert summary.sparkline[0] == 700.0
+
+
+def test_batch_report_has_a_row_per_tape(tmp_path):
+    summaries = [
+        TapeSummary("A", "A.dat", "Product", True,
+                    ok_tape_sections=[TapeSection(0.0, 10.0),
+                                      TapeSection(12.0, 42.0)],
+                    fail_counts={'Average Value': 0, 'Drop Out': 0},
+                    report_path=str(tmp_path / "reports" / "Report A.pdf"),
+                    sparkline=(700.0, 690.0, 705.0)),
+        TapeSummary("B<1>", "B.dat", "Product", False,
+                    fail_counts={'Average Value': 0, 'Drop Out': 3}),
+        TapeSummary("C", "C.dat", "Product", error="ValueError('broken')")]
+
+    path = tmp_path / "batch.html"
+    save_batch_report(summaries, str(path))
+    html = path.read_text(encoding="utf-8")
+
+    assert html == batch_report_html(summaries, base_dir=str(tmp_path))
+    assert "1 of 3 tapes passed." in html
+    assert html.count("<tr>") == 4
+    assert "<th>Average Value</th><th>Drop Out</th>" in html
+    assert "<th>Minimum Value</th>" not in html
+    assert '<td class="number">40.00</td><td class="number">30.00</td>' in html
+    assert "fail (3)" in html
+    assert "B&lt;1&gt;" in html
+    assert "ValueError(&#x27;broken&#x27;)" in html
+    assert '<a href="reports/Report A.pdf">PDF</a>' in html
+    assert html.count("<svg") == 1
+
+
+def test_sparkline_is_scaled_from_zero_to_maximum():
+    svg = sparkline_svg([100.0, 50.0, 0.0], width=10, height=20)
+
+    assert 'points="0.0,0.0 5.0,10.0 10.0,20.0"' in svg
+    assert sparkline_svg([1.0]) == ""
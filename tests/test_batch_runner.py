@@ -0,0 +1,177 @@
+import os
+import numpy as np
+import pytest
+from quality_assessment import batch_runner
+from quality_assessment.batch_runner import (TapePipeline, TapeSummary,
+                                           run_batch, tape_files)
+from quality_assessment.helper import load_data
+from quality_assessment.products import TapeProduct
+from quality_assessment.quality_assessor import TapeQualityAssessor
+from quality_assessment.tape_quality_information import TapeQualityInformation
+from quality_assessment.tape_trace import TapeTrace
+from .conftest import TAPESTAR_HEADER, write_tapestar_export
+
+
+def _write_tapestar_file(path, dip_depth):
+    positions = np.arange(4000) * 0.05
+    values = np.full(positions.size, 150.0)
+    values[1000:1010] -= dip_depth
+    values[:20] = 1.0
+    write_tapestar_export(path, positions, values)
+
+
+@pytest.fixture(name="data_dir")
+def fixture_data_dir(tmp_path):
+    for i, depth in enumerate([0.0, 20.0, 60.0, 140.0]):
+        _write_tapestar_file(tmp_path / f"tape{i}.dat", depth)
+    (tmp_path / "notes.txt").write_text("no data")
+    return tmp_path
+
+
+@pytest.mark.parametrize("ordered", [True, False])
+def test_run_batch_matches_single_assessment(data_dir, ordered):
+    paths = tape_files(str(data_dir))
+    product = TapeProduct.SUPERLINK_PHASE
+
+    summaries = list(run_batch(paths, product, 150.0, processes=2,
+                               maxtasksperchild=1, ordered=ordered,
+                               convert_to_meters=False))
+
+    if ordered:
+        assert [summary.file_path for summary in summaries] == paths
+        assert [summary.passed for summary in summaries] == [True, True,
+                                                             False, False]
+    for summary in sorted(summaries, key=lambda summary: summary.file_path):
+        info = TapeQualityInformation(load_data(summary.file_path),
+                                      summary.tape_id, 150.0)
+        assessor = TapeQualityAssessor(info, product.value)
+        assessor.assess_meets_specs()
+        assessor.determine_ok_tape_section(product.value.min_tape_length)
+        assert summary == TapeSummary.from_assessor(assessor,
+                                                    summary.file_path)
+
+
+def test_run_batch_reports_errors_per_file(data_dir):
+    broken = data_dir / "broken.dat"
+    broken.write_text(TAPESTAR_HEADER)
+
+    summaries = list(run_batch([str(broken), str(data_dir / "tape0.dat")],
+                               TapeProduct.SUPERLINK_PHASE, 150.0,
+                               processes=1))
+
+    assert summaries[0].error is not None
+    assert summaries[1].error is None and summaries[1].passed
+
+
+def test_run_batch_checks_report_directory_when_called(tmp_path):
+    missing = str(tmp_path / "missing")
+
+    with pytest.raises(ValueError, match="does not exist"):
+        run_batch([], TapeProduct.SUPERLINK_PHASE, 150.0,
+                  save_pdf_to=missing)
+
+
+def test_pipeline_gives_same_summaries_as_run_batch(data_dir):
+    paths = tape_files(str(data_dir))
+    (data_dir / "broken.dat").write_text(TAPESTAR_HEADER)
+    paths.append(str(data_dir / "broken.dat"))
+    pipeline = TapePipeline(TapeProduct.SUPERLINK_PHASE, 150.0,
+                            analyse_workers=2, queue_size=1)
+
+    summaries = sorted(pipeline.run(paths),
+                       key=lambda summary: summary.file_path)
+
+    expected = sorted(run_batch(paths, TapeProduct.SUPERLINK_PHASE, 150.0,
+                                processes=2),
+                      key=lambda summary: summary.file_path)
+    assert [summary.error is None for summary in summaries] == [
+        summary.error is None for summary in expected]
+    assert [summary for summary in summaries if summary.error is None] == [
+        summary for summary in expected if summary.error is None]
+    assert [stage.name for stage in pipeline.statistics] == [
+        'load', 'analyse', 'render']
+    assert [stage.workers for stage in pipeline.statistics] == [1, 2, 1]
+    assert pipeline.statistics[0].items == len(paths)
+    assert pipeline.statistics[2].items == len(paths) - 1
+    assert pipeline.slowest_stage in pipeline.statistics
+
+
+def test_pipeline_with_shared_memory(data_dir):
+    paths = tape_files(str(data_dir))
+
+    summaries = {
+        shared_memory: sorted(
+            TapePipeline(TapeProduct.SUPERLINK_PHASE, 150.0,
+                         shared_memory=shared_memory).run(paths),
+            key=lambda summary: summary.file_path)
+        for shared_memory in (False, True)
+    }
+
+    assert all(summary.error is None for summary in summaries[True])
+    assert summaries[True] == summaries[False]
+
+
+def test_pipeline_raises_error_of_paths_after_fed_tapes(data_dir):
+    paths = tape_files(str(data_dir))
+
+    def failing_paths():
+        yield paths[0]
+        raise OSError("listing failed")
+
+    summaries = []
+    with pytest.raises(OSError, match="listing failed"):
+        for summary in TapePipeline(TapeProduct.SUPERLINK_PHASE,
+                                    150.0).run(failing_paths()):
+            summaries.append(summary)
+
+    assert [summary.file_path for summary in summaries] == paths[:1]
+
+
+def test_pipeline_raises_error_if_workers_die(data_dir, monkeypatch):
+    def dying_worker(item, settings):
+        os._exit(3)
+
+    # the workers are forked and use the patched stage function
+    monkeypatch.setattr(batch_runner, "_render_tape", dying_worker)
+
+    with pytest.raises(RuntimeError, match="died with exit code 3"):
+        list(TapePipeline(TapeProduct.SUPERLINK_PHASE, 150.0,
+                          queue_size=1).run(tape_files(str(data_dir))))
+
+
+@pytest.mark.skipif(not os.path.isdir("/dev/shm"),
+                    reason="shared memory blocks are not listed as files")
+def test_pipeline_removes_shared_memory_when_stopped_early(data_dir):
+    paths = tape_files(str(data_dir)) * 3
+    blocks_before = set(os.listdir("/dev/shm"))
+    run = TapePipeline(TapeProduct.SUPERLINK_PHASE, 150.0, queue_size=2,
+                       shared_memory=True).run(paths)
+
+    next(run)
+    run.close()
+
+    assert set(os.listdir("/dev/shm")) <= blocks_before
+
+
+def test_rendered_report_plot_keeps_all_drop_outs(tmp_path, monkeypatch):
+    positions = np.arange(400000) * 1e-3
+    values = np.full(positions.size, 150.0)
+    # a deep dip and a shallow drop-out in the same bucket of the plot
+    values[100050:100053] = 60.0
+    values[100120:100123] = 110.0
+    figures = []
+    make_plot = TapeQualityAssessor._make_plot
+
+    def keep_figure(self, *args, **kwargs):
+        figures.append(make_plot(self, *args, **kwargs))
+        return figures[-1]
+
+    monkeypatch.setattr(TapeQualityAssessor, "_make_plot", keep_figure)
+    settings = batch_runner._WorkerSettings(TapeProduct.SUPERLINK_PHASE,
+                                            150.0, str(tmp_path), False, None)
+    batch_runner._render_trace(TapeTrace(positions, values), "tape.dat", [],
+                               [], settings)
+
+    plotted = figures[0].axes[0].lines[0].get_ydata()
+    assert plotted.size < positions.size
+    assert 60.0 in plotted and 110.0 in plotted
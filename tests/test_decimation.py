@@ -0,0 +1,34 @@
+import numpy as np
+import pytest
+from quality_assessment.decimation import min_max_indices
+
+
+def test_min_max_indices_keep_extremes_of_every_bucket():
+    rng = np.random.default_rng(5)
+    values = rng.normal(100.0, 5.0, 10001)
+    values[1234] = 3.0
+
+    indices = min_max_indices(values, 100)
+
+    assert indices.size <= 2 * 100 + 2
+    assert np.all(np.diff(indices) > 0)
+    assert indices[0] == 0 and indices[-1] == values.size - 1
+    assert 1234 in indices
+    for start in range(0, values.size, 101):
+        bucket = indices[(indices >= start) & (indices < start + 101)]
+        assert values[bucket].min() == values[start:start + 101].min()
+        assert values[bucket].max() == values[start:start + 101].max()
+
+
+def test_min_max_indices_keep_given_indices():
+    values = np.linspace(0.0, 1.0, 1000)
+
+    indices = min_max_indices(values, 10, keep_indices=[17, 500])
+
+    assert {17, 500} <= set(indices.tolist())
+
+
+def test_min_max_indices_keep_short_traces():
+    assert min_max_indices(np.zeros(20), 10).tolist() == list(range(20))
+    with pytest.raises(ValueError, match="Number of buckets must be positive."):
+        min_max_indices(np.zeros(20), 0)
@@ -0,0 +1,87 @@
+from math import isclose
+import numpy as np
+import pytest
+from scipy.signal import find_peaks
+from quality_assessment.drop_out_analysis import (PEAK_DISTANCE,
+                                                  half_max_positions,
+                                                  merge_duplicate_peaks,
+                                                  select_by_peak_distance)
+
+
+def test_half_max_positions_interpolates_crossings():
+    positions = np.arange(10, dtype=float)
+    values = np.array([10., 10., 8., 4., 0., 4., 8., 10., 10., 10.])
+    start, end = half_max_positions(positions, values, np.array([4]),
+                                    np.array([5.0]))
+    assert start == pytest.approx([2.75])
+    assert end == pytest.approx([5.25])
+
+
+def test_half_max_positions_without_crossing_uses_data_limits():
+    positions = np.arange(5, dtype=float)
+    values = np.array([1., 1., 0., 1., 1.])
+    start, end = half_max_positions(positions, values, np.array([2]),
+                                    np.array([5.0]))
+    assert start == pytest.approx([0.0])
+    assert end == pytest.approx([4.0])
+
+
+def _merge_one_by_one(starts, ends, values, pos_tol, last_peak):
+    kept = [-1]
+    last_start, last_end, last_value = last_peak
+    for i, (start, end, value) in enumerate(zip(starts, ends, values)):
+        if (isclose(start, last_start, abs_tol=pos_tol)
+                and isclose(end, last_end, abs_tol=pos_tol)):
+            if value < last_value:
+                kept[-1] = i
+                last_start, last_end, last_value = start, end, value
+        else:
+            kept.append(i)
+            last_start, last_end, last_value = start, end, value
+    return kept
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_merge_duplicate_peaks_matches_sequential_merge(seed):
+    rng = np.random.default_rng(seed)
+    steps = rng.choice([0.0, 0.001, 0.0025, 0.004, 0.01, 1.0], 500)
+    starts = np.cumsum(steps) + rng.normal(0.0, 1e-3, 500)
+    ends = starts + rng.choice([0.01, 0.0105, 0.02], 500)
+    values = rng.integers(0, 6, 500).astype(float)
+    last_peak = (starts[0], ends[0], 3.0)
+
+    replacement, kept = merge_duplicate_peaks(starts, ends, values, 2e-3,
+                                              last_peak)
+    expected = _merge_one_by_one(starts.tolist(), ends.tolist(),
+                                 values.tolist(), 2e-3, last_peak)
+    assert [replacement] + kept.tolist() == expected
+
+
+def test_merge_duplicate_peaks_keeps_first_lowest():
+    starts = np.array([1.0, 1.001, 0.9995, 2.0])
+    ends = starts + 0.1
+    values = np.array([5.0, 3.0, 3.0, 4.0])
+    replacement, kept = merge_duplicate_peaks(starts, ends, values, 2e-3)
+    assert replacement == -1
+    assert kept.tolist() == [1, 3]
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_select_by_peak_distance_matches_find_peaks(seed):
+    rng = np.random.default_rng(seed)
+    values = rng.normal(0.0, 1.0, 5000).cumsum() % 7.0 + rng.normal(0.0, 1.0,
+                                                                     5000)
+    expected, _ = find_peaks(-values, height=(-3.0, 0),
+                             distance=PEAK_DISTANCE)
+
+    candidates, _ = find_peaks(-values, height=(-3.0, 0))
+    selected = select_by_peak_distance(candidates, values[candidates])
+
+    assert np.array_equal(candidates[selected], expected)
+
+
+def test_select_by_peak_distance_selects_first_of_equal_peaks():
+    indices = np.array([0, 4, 10, 30])
+    selected = select_by_peak_distance(indices,
+                                       np.array([1.0, 1.0, 1.0, 1.0]))
+    assert selected.tolist() == [True, False, True, True]
@@ -0,0 +1,59 @@
+import os
+import numpy as np
+from quality_assessment.helper import load_data
+from quality_assessment.tape_quality_information import \
+    TapeQualityInformation
+from .conftest import write_tapestar_export
+
+
+def _write_tapestar_file(path, values):
+    write_tapestar_export(path, range(len(values)), values)
+
+
+def test_load_data_with_cache_uses_memory_map(tmp_path):
+    source = tmp_path / "tape.dat"
+    _write_tapestar_file(source, [100.0, 101.0, 102.0])
+    cache_dir = str(tmp_path / "cache")
+
+    parsed = load_data(str(source), True, cache_dir=cache_dir)
+    cached = load_data(str(source), True, cache_dir=cache_dir)
+
+    assert cached.iloc[:, 0].tolist() == [0.0, 0.001, 0.002]
+    assert cached.iloc[:, 1].tolist() == parsed.iloc[:, 1].tolist()
+    array = cached.iloc[:, 1].to_numpy()
+    while array is not None and not isinstance(array, np.memmap):
+        array = array.base
+    assert isinstance(array, np.memmap)
+
+
+def test_cached_data_is_used_without_copying(tmp_path):
+    source = tmp_path / "tape.dat"
+    _write_tapestar_file(source, [100.0, 101.0, 102.0])
+    cache_dir = str(tmp_path / "cache")
+    _ = load_data(str(source), True, cache_dir=cache_dir)
+    cached = load_data(str(source), True, cache_dir=cache_dir)
+
+    info = TapeQualityInformation(cached, "ID", 100.0)
+
+    assert info.data is info.trace
+    for column, array in zip(cached.columns, (info.trace.positions,
+                                              info.trace.values)):
+        base = array
+        while base is not None and not isinstance(base, np.memmap):
+            base = base.base
+        assert isinstance(base, np.memmap)
+        assert np.shares_memory(array, cached[column].to_numpy())
+
+
+def test_load_data_with_cache_reparses_changed_file(tmp_path):
+    source = tmp_path / "tape.dat"
+    _write_tapestar_file(source, [100.0, 101.0, 102.0])
+    cache_dir = str(tmp_path / "cache")
+    _ = load_data(str(source), False, cache_dir=cache_dir)
+
+    _write_tapestar_file(source, [200.0, 201.0, 202.0, 203.0])
+    stat = os.stat(source)
+    os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+    data = load_data(str(source), False, cache_dir=cache_dir)
+
+    assert data.iloc[:, 1].tolist() == [200.0, 201.0, 202.0, 203.0]
@@ -0,0 +1,66 @@
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pytest
+from scipy.signal import find_peaks
+from quality_assessment.parallel_analysis import parallel_peak_candidates
+from quality_assessment.tape_quality_information import TapeQualityInformation
+from .conftest import tape_with_dips, tape_with_peak_chains
+
+
+def _tape_data(size=20000):
+    rng = np.random.default_rng(3)
+    return tape_with_dips(size, rng.integers(200, size - 200, 60),
+                          rng.uniform(40.0, 140.0, 60), 10, seed=3)
+
+
+@pytest.mark.parametrize("use_true_baseline", [False, True])
+def test_parallel_analysis_matches_serial_analysis(use_true_baseline):
+    data = _tape_data()
+    results = []
+    for workers in (1, 7):
+        info = TapeQualityInformation(data, "ID", 150.0)
+        info.calculate_piecewise_statistics(0.3, workers=workers)
+        info.calculate_drop_out_info(use_true_baseline, workers=workers)
+        results.append(info)
+    serial, parallel = results
+
+    for name in ('averages', 'scattering', 'dropouts'):
+        for attribute in ('p_id', 'start_position', 'end_position',
+                          'center_position', 'value'):
+            assert np.array_equal(
+                getattr(getattr(serial, name), attribute),
+                getattr(getattr(parallel, name), attribute))
+    assert len(serial.dropouts) > 20
+
+
+def test_parallel_analysis_matches_serial_analysis_for_peak_chains():
+    # dense sub-threshold peaks closer than PEAK_DISTANCE over the whole tape,
+    # where only a search in one go gets the serial selection of peaks
+    positions, values = tape_with_peak_chains()
+    results = []
+    for workers in (1, 7):
+        info = TapeQualityInformation((positions, values), "ID", 150.0)
+        info.calculate_drop_out_info(False, workers=workers)
+        results.append(info.dropouts)
+    serial, parallel = results
+    assert len(serial) > 3
+
+    for attribute in ('p_id', 'start_position', 'end_position',
+                      'center_position', 'value'):
+        assert np.array_equal(getattr(serial, attribute),
+                              getattr(parallel, attribute))
+
+
+@pytest.mark.parametrize("segments", [2, 3, 7, 50])
+def test_parallel_peak_candidates_match_whole_search(segments):
+    # few levels, so that plateaus of equal values reach up to the seams
+    rng = np.random.default_rng(segments)
+    values = np.round(rng.uniform(0.0, 3.0, 5000))
+    above = np.flatnonzero(values > 2.0)
+
+    with ThreadPoolExecutor(segments) as executor:
+        candidates = parallel_peak_candidates(values, above[0], above[-1],
+                                              2.0, executor, segments)
+    expected, _ = find_peaks(-values, height=(-2.0, 0))
+
+    assert np.array_equal(candidates, expected)
@@ -1,8 +1,16 @@
+import math
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import replace
+import numpy
 import pytest
 import pandas
+import matplotlib.pyplot as plt
 import quality_assessment.quality_assessor as qa
 from quality_assessment.products import TapeProduct
 from quality_assessment.tape_quality_information import TapeQualityInformation
+from quality_assessment.data_types import (AveragesInfo, PeakInfo,
+                                           QualityReport, TapeSection,
+                                           TestType)
 
 
 def test_save_pdf_raises_value_error():
@@ -13,3 +21,132 @@ def test_save_pdf_raises_value_error():
     dirname = "./unknown_directory"
     with pytest.raises(ValueError, match=f"Directory {dirname} does not exist"):
         assessor.save_pdf_report(dirname)
+
+
+def test_determine_ok_tape_section_subtracts_all_fails():
+    tape_spec = TapeProduct.STANDARD3.value
+    data = {'x': [float(i) for i in range(11)], 'y': [10.0] * 11}
+    quality_info = TapeQualityInformation(pandas.DataFrame(data), "ID", 10.0)
+    assessor = qa.TapeQualityAssessor(quality_info, tape_spec)
+    assessor.quality_reports = [
+        QualityReport("ID", TestType.AVERAGE,
+                      [AveragesInfo(0, -1.0, 1.0, 1.0),
+                       AveragesInfo(1, 4.0, 5.0, 1.0)]),
+        QualityReport("ID", TestType.DROPOUT,
+                      [PeakInfo(0, 3.0, 4.5, 3.5, 1.0),
+                       PeakInfo(1, 5.0, 5.5, 5.2, 1.0),
+                       PeakInfo(2, 3.2, 3.4, 3.3, 1.0),
+                       PeakInfo(3, 9.5, 12.0, 10.0, 1.0)])]
+
+    assessor.determine_ok_tape_section(1.0)
+
+    assert assessor.ok_tape_sections == [TapeSection(1.0, 3.0),
+                                         TapeSection(5.5, 9.5)]
+
+
+@pytest.mark.parametrize("width_func", [
+    lambda ic: math.exp(ic / 20.0),
+    lambda ic: numpy.exp(ic / 20.0),
+    lambda ic: 20.0])
+def test_dropout_fails_evaluates_width_func(width_func):
+    tape_spec = replace(TapeProduct.STANDARD3.value, dropout_value=50.0,
+                        dropout_func=width_func)
+    peaks = [PeakInfo(0, 1.0, 1.002, 1.001, 60.0),
+             PeakInfo(1, 2.0, 2.030, 2.010, 60.0),
+             PeakInfo(2, 3.0, 3.002, 3.001, 40.0),
+             PeakInfo(3, 4.0, 4.050, 4.010, 600.0)]
+
+    fails = qa.dropout_fails(peaks, tape_spec)
+
+    assert [fail.p_id for fail in fails] == [1, 2]
+
+
+def test_moving_averages_find_weak_stretch_across_pieces():
+    positions = numpy.arange(0.0, 10.0, 0.125)
+    values = numpy.full(positions.size, 200.0)
+    # 1 m weak stretch across the piece boundary at 5 m
+    values[(positions >= 4.5) & (positions < 5.5)] = 120.0
+    tape_spec = replace(TapeProduct.SUPERLINK_PHASE.value, min_value=50.0)
+
+    fails = {}
+    for step in (None, 0.125):
+        quality_info = TapeQualityInformation((positions, values), "ID",
+                                              200.0)
+        assessor = qa.TapeQualityAssessor(
+            quality_info, replace(tape_spec, averaging_step=step))
+        assessor.assess_meets_specs()
+        fails[step] = assessor.quality_reports[0].fail_information
+
+    assert fails[None] is None
+    assert [fail.start_position for fail in fails[0.125]] == [4.375, 4.5,
+                                                           4.625]
+
+
+def test_assess_products_matches_single_assessments():
+    positions = numpy.arange(0.0, 60.0, 0.01)
+    values = numpy.full(positions.size, 700.0)
+    values[1000:1400] = 650.0
+    values[3000:3003] = 100.0
+    quality_info = TapeQualityInformation((positions, values), "ID", 700.0)
+    products = [TapeProduct.STANDARD1.value, TapeProduct.STANDARD2.value,
+                TapeProduct.STANDARD3.value]
+
+    assessors = qa.assess_products(quality_info, products)
+
+    for product, assessor in zip(products, assessors):
+        single = qa.TapeQualityAssessor(
+            TapeQualityInformation((positions, values), "ID", 700.0),
+            product)
+        single.assess_meets_specs()
+        single.determine_ok_tape_section(product.min_tape_length)
+        assert assessor.tape_specs is product
+        assert assessor.ok_tape_sections == single.ok_tape_sections
+        assert ([report.passed for report in assessor.quality_reports] ==
+                [report.passed for report in single.quality_reports])
+        assert (assessor.tape_quality_info.dropouts.p_id.tolist() ==
+                single.tape_quality_info.dropouts.p_id.tolist())
+
+
+def test_plot_draws_fails_with_few_artists():
+    tape_spec = TapeProduct.STANDARD3.value
+    data = {'x': [float(i) for i in range(11)], 'y': [10.0] * 11}
+    quality_info = TapeQualityInformation(pandas.DataFrame(data), "ID", 10.0)
+    assessor = qa.TapeQualityAssessor(quality_info, tape_spec)
+    dropouts = [PeakInfo(i, i - 0.1, i + 0.1, 1.0) for i in range(1, 10)]
+    assessor.quality_reports = [
+        QualityReport("ID", TestType.AVERAGE,
+                      [AveragesInfo(0, 2.0, 4.0, 8.0),
+                       AveragesInfo(1, 6.0, 8.0, 8.0)]),
+        QualityReport("ID", TestType.MINIMUM, dropouts[:4]),
+        QualityReport("ID", TestType.DROPOUT, dropouts)]
+
+    axis = assessor._make_plot().axes[0]
+
+    assert len(axis.collections) == 3
+    assert len(axis.lines) == 3
+    assert axis.collections[2].get_offsets().shape == (13, 2)
+    assert axis.get_legend_handles_labels()[1] == ['Data', 'Averages Failed',
+                                                   'Minimum Failed']
+
+
+def test_reports_are_rendered_concurrently_without_pyplot(tmp_path):
+    positions = numpy.arange(0.0, 60.0, 0.01)
+    values = numpy.full(positions.size, 700.0)
+    values[3000:3003] = 100.0
+    assessors = []
+    for tape_id in ("A", "B", "C", "D"):
+        quality_info = TapeQualityInformation((positions, values), tape_id,
+                                              700.0)
+        assessor = qa.TapeQualityAssessor(quality_info,
+                                          TapeProduct.STANDARD3.value)
+        assessor.assess_meets_specs()
+        assessors.append(assessor)
+    figures_before = plt.get_fignums()
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        list(executor.map(lambda assessor: assessor.save_pdf_report(
+            str(tmp_path)), assessors))
+
+    assert sorted(path.name for path in tmp_path.iterdir()) == [
+        f"Report {tape_id}.pdf" for tape_id in ("A", "B", "C", "D")]
+    assert plt.get_fignums() == figures_before
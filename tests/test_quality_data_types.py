@@ -1,7 +1,9 @@
+import pickle
 import pytest
 from quality_assessment.data_types import (QualityReport, TestType, PeakInfo,
                                            AveragesInfo, ScatterInfo,
-                                           QualityParameterInfo)
+                                           QualityParameterInfo,
+                                           QualityParameterArray)
 
 
 def test_qualityreport_init():
@@ -22,3 +24,51 @@ def test_averagesinfo_conforms_protocoll():
 def test_scatterinfo_conforms_protocoll():
     info = ScatterInfo()
     assert isinstance(info, QualityParameterInfo)
+
+
+def test_info_classes_have_slots():
+    for info in (PeakInfo(), AveragesInfo(), ScatterInfo()):
+        assert not hasattr(info, '__dict__')
+        assert isinstance(info, QualityParameterInfo)
+
+
+def test_quality_parameter_array():
+    peaks = [PeakInfo(i, 1.0 * i, 1.0 * i + 0.5, 1.0 * i + 0.2, 10.0 * i)
+             for i in range(4)]
+    infos = QualityParameterArray.from_infos(PeakInfo, peaks)
+
+    assert len(infos) == 4
+    assert infos.width == pytest.approx([0.5] * 4)
+    for info, peak in zip(infos, peaks):
+        assert isinstance(info, PeakInfo)
+        assert isinstance(info, QualityParameterInfo)
+        assert (info.p_id, info.start_position, info.end_position,
+                info.center_position, info.value) == (
+                    peak.p_id, peak.start_position, peak.end_position,
+                    peak.center_position, peak.value)
+    assert infos[-1].value == 30.0
+
+    selected = infos[infos.value > 15.0]
+    assert isinstance(selected, QualityParameterArray)
+    assert selected.p_id.tolist() == [2, 3]
+
+
+def test_quality_parameter_array_pickle():
+    infos = QualityParameterArray(AveragesInfo, [0, 1], [0.0, 1.0],
+                                  [1.0, 2.0], [100.0, 90.0])
+    restored = pickle.loads(pickle.dumps(infos))
+    assert restored.info_type is AveragesInfo
+    assert restored.value.tolist() == [100.0, 90.0]
+    assert restored.center_position.tolist() == [0.5, 1.5]
+    assert isinstance(restored[1], AveragesInfo)
+
+
+def test_quality_parameter_array_locate():
+    # contiguous pieces including an empty one at 2.0
+    infos = QualityParameterArray(AveragesInfo, [0, 1, 2, 3],
+                                  [0.0, 1.0, 2.0, 2.0], [1.0, 2.0, 2.0, 3.0],
+                                  [10.0, 20.0, 30.0, 40.0])
+    positions = [-1.0, 0.0, 0.5, 1.0, 1.5, 2.0, 2.5, 3.0, 4.0]
+    assert infos.locate(positions).tolist() == [-1, -1, 0, -1, 1, -1, 3, -1,
+                                                -1]
+    assert QualityParameterArray(AveragesInfo).locate([1.0]).tolist() == [-1]
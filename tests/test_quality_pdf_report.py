@@ -0,0 +1,104 @@
+import fpdf.image_parsing
+import pytest
+from fpdf.image_parsing import get_img_info
+from matplotlib.figure import Figure
+from PIL import Image, ImageCms
+from quality_assessment import quality_pdf_report
+from quality_assessment.data_types import QualityReport, TapeSection, TestType
+from quality_assessment.quality_pdf_report import (LOGO_PATH,
+                                                   DefectReportPDF,
+                                                   PlotImageFormat,
+                                                   PlotImageSettings,
+                                                   ReportPDFCreator,
+                                                   _static_image_info)
+
+
+def _report(image_settings):
+    figure = Figure(figsize=(9.5, 3.1))
+    figure.subplots().plot([0.0, 1.0, 2.0], [10.0, 2.0, 10.0])
+    return ReportPDFCreator("ID", "Product", figure,
+                            [QualityReport("ID", TestType.AVERAGE)],
+                            [TapeSection(0.0, 2.0)], image_settings)
+
+
+@pytest.mark.parametrize("image_format, marker", [
+    (PlotImageFormat.PNG, b"/FlateDecode"),
+    (PlotImageFormat.JPEG, b"/DCTDecode"),
+    (PlotImageFormat.SVG, b"/Type /Page")])
+def test_plot_is_embedded_in_chosen_format(tmp_path, image_format, marker):
+    report = _report(PlotImageSettings(image_format, dpi=72.0))
+    report.create_report()
+    path = tmp_path / "report.pdf"
+    report.save_report(str(path))
+
+    assert marker in path.read_bytes()
+
+
+def test_plot_image_is_rgb_at_chosen_dpi():
+    report = _report(PlotImageSettings(dpi=50.0))
+
+    image = report._plot_image()
+
+    assert isinstance(image, Image.Image)
+    assert image.mode == 'RGB'
+    assert image.size == (475, 155)
+
+
+def test_jpeg_plot_image_is_encoded_at_chosen_dpi():
+    report = _report(PlotImageSettings(PlotImageFormat.JPEG, dpi=50.0))
+
+    image = Image.open(report._plot_image())
+
+    assert image.format == 'JPEG'
+    assert image.mode == 'RGB'
+    assert image.size == (475, 155)
+
+
+def test_plot_image_settings_are_validated():
+    with pytest.raises(ValueError, match="DPI must be positive."):
+        PlotImageSettings(dpi=0.0)
+    with pytest.raises(ValueError, match="JPEG quality"):
+        PlotImageSettings(jpeg_quality=100)
+
+
+def test_logo_is_decoded_once_across_reports(monkeypatch):
+    decoded = []
+
+    def counting_get_img_info(filename, *args, **kwargs):
+        decoded.append(filename)
+        return get_img_info(filename, *args, **kwargs)
+
+    monkeypatch.setattr(quality_pdf_report, "get_img_info",
+                        counting_get_img_info)
+    monkeypatch.setattr(fpdf.image_parsing, "get_img_info",
+                        counting_get_img_info)
+    _static_image_info.cache_clear()
+
+    first = _report(PlotImageSettings())
+    first.create_report()
+    second = DefectReportPDF("ID", "Product", "L")
+    second.add_page()
+    second.add_page()
+    output = bytes(second.output())
+    _static_image_info.cache_clear()
+
+    assert decoded.count(LOGO_PATH) == 1
+    assert first._pdf.image_cache.images[LOGO_PATH]["usages"] == 1
+    assert second.image_cache.images[LOGO_PATH]["usages"] == 2
+    assert output.count(b"/Subtype /Image") == 2
+
+
+def test_cached_image_keeps_icc_profile(tmp_path):
+    path = str(tmp_path / "logo.png")
+    profile = ImageCms.ImageCmsProfile(ImageCms.createProfile("sRGB"))
+    Image.new("RGB", (4, 4), "red").save(path,
+                                         icc_profile=profile.tobytes())
+
+    pdf = DefectReportPDF("ID", "Product", "L")
+    pdf._add_static_image(path)
+    pdf.add_page()
+    pdf.image(path, w=10)
+    output = bytes(pdf.output())
+
+    assert pdf.image_cache.images[path]["iccp_i"] == 0
+    assert b"/ICCBased" in output
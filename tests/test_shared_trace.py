@@ -0,0 +1,57 @@
+from multiprocessing import Pool
+import numpy as np
+import pytest
+from quality_assessment.shared_trace import SharedTrace
+from quality_assessment.tape_quality_information import TapeQualityInformation
+from quality_assessment.tape_trace import TapeTrace
+
+
+def _trace():
+    positions = np.arange(0.0, 10.0, 0.125)
+    return TapeTrace(positions, 2.0 + np.sin(positions))
+
+
+def _first_average(handle):
+    shared = SharedTrace.attach(handle)
+    info = TapeQualityInformation(shared.trace, "ID", 2.0)
+    info.calculate_piecewise_statistics(1.0)
+    average = float(info.averages.value[0])
+    del info
+    shared.close()
+    return average
+
+
+def test_attached_trace_is_a_view_on_the_block():
+    trace = _trace()
+    with SharedTrace.create(trace) as shared:
+        attached = SharedTrace.attach(shared.handle)
+        info = TapeQualityInformation(attached.trace, "ID", 2.0)
+        assert info.trace.values.tolist() == trace.values.tolist()
+
+        shared.trace.values[0] = 42.0
+        assert info.trace.values[0] == 42.0
+        del info
+        attached.close()
+
+    with pytest.raises(FileNotFoundError):
+        SharedTrace.attach(shared.handle)
+
+
+def test_trace_is_used_in_other_process():
+    trace = _trace()
+    info = TapeQualityInformation(trace, "ID", 2.0)
+    info.calculate_piecewise_statistics(1.0)
+
+    with SharedTrace.create(trace) as shared:
+        with Pool(1) as pool:
+            average = pool.apply(_first_average, (shared.handle, ))
+
+    assert average == info.averages.value[0]
+
+
+def test_closed_trace_raises_value_error():
+    shared = SharedTrace.create(_trace())
+    shared.close()
+    with pytest.raises(ValueError, match="Shared trace is closed"):
+        _ = shared.trace
+    shared.unlink()
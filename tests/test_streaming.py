@@ -0,0 +1,195 @@
+import numpy as np
+import pandas as pd
+import pytest
+from quality_assessment.data_types import TestType
+from quality_assessment.products import TapeProduct
+from quality_assessment.quality_assessor import TapeQualityAssessor
+from quality_assessment.streaming import (LiveTapeAssessor,
+                                         StreamingTapeAnalyzer,
+                                         assess_streaming)
+from quality_assessment.tape_quality_information import TapeQualityInformation
+from .conftest import (TAPESTAR_HEADER, tape_with_dips,
+                       tape_with_peak_chains, tapestar_rows,
+                       write_tapestar_export)
+
+
+def _tape_data(size=6000):
+    centers = range(300, size - 300, 450)
+    return tape_with_dips(size, centers, [90.0] * len(centers), 8, seed=1)
+
+
+def _attributes(infos):
+    return [(i.p_id, i.start_position, i.end_position, i.value) for i in infos]
+
+
+@pytest.mark.parametrize("chunk_size, max_history", [(700, 700), (37, 1500)])
+@pytest.mark.parametrize("use_true_baseline", [False, True])
+def test_streaming_matches_batch_analysis(use_true_baseline, chunk_size,
+                                          max_history):
+    positions, values = _tape_data()
+    info = TapeQualityInformation((positions, values), 'id', 150.0)
+    info.calculate_piecewise_statistics(0.5)
+    info.calculate_drop_out_info(use_true_baseline)
+
+    analyzer = StreamingTapeAnalyzer('id', 150.0, 0.5, use_true_baseline,
+                                     max_history=max_history)
+    dropouts = []
+    for first in range(0, positions.size, chunk_size):
+        update = analyzer.update(positions[first:first + chunk_size],
+                                 values[first:first + chunk_size])
+        dropouts += update.dropouts
+    dropouts += analyzer.finish().dropouts
+
+    assert (np.array(_attributes(analyzer.averages)) ==
+            pytest.approx(np.array(_attributes(info.averages))))
+    assert (np.array(_attributes(analyzer.scattering)) ==
+            pytest.approx(np.array(_attributes(info.scattering))))
+    assert (np.array(_attributes(dropouts)) ==
+            pytest.approx(np.array(_attributes(info.dropouts))))
+    assert analyzer.tape_section == info.tape_section
+
+
+def test_assess_streaming_matches_assessor(tmp_path):
+    positions, values = _tape_data()
+    source = tmp_path / "tape.dat"
+    write_tapestar_export(source, positions, values)
+    spec = TapeProduct.SUPERLINK_PHASE.value
+
+    streamed = assess_streaming(str(source), 'id', spec, 150.0, chunk_size=500)
+    assessor = TapeQualityAssessor(
+        TapeQualityInformation(pd.DataFrame({'x': positions, 'y': values}),
+                               'id', 150.0), spec)
+    assessor.assess_meets_specs()
+    assessor.determine_ok_tape_section(spec.min_tape_length)
+
+    assert ([r.passed for r in streamed.quality_reports] ==
+            [r.passed for r in assessor.quality_reports])
+    assert streamed.ok_tape_sections == assessor.ok_tape_sections
+
+
+def test_live_assessor_reports_fails_while_file_grows(tmp_path):
+    positions, values = _tape_data()
+    rows = tapestar_rows(positions, values)
+    source = tmp_path / "tape.dat"
+    spec = TapeProduct.SUPERLINK_PHASE.value
+    live = LiveTapeAssessor(str(source), 'id', spec, 150.0)
+
+    source.write_text(TAPESTAR_HEADER + "".join(rows[:3000]))
+    early_reports = live.poll()
+    with open(source, 'a', encoding='utf8') as file:
+        file.write("".join(rows[3000:]))
+    reports = early_reports + live.poll() + live.finish()
+
+    assessor = TapeQualityAssessor(
+        TapeQualityInformation((positions, values), 'id', 150.0), spec)
+    assessor.assess_meets_specs()
+    expected = {report.test_type: report.fail_information
+                for report in assessor.quality_reports if not report.passed}
+
+    assert early_reports and expected
+    for test_type, fails in expected.items():
+        live_fails = [fail for report in reports
+                      if report.test_type == test_type
+                      for fail in report.fail_information]
+        assert ([fail.center_position for fail in live_fails] ==
+                pytest.approx([fail.center_position for fail in fails]))
+
+
+def test_assess_streaming_whole_tape_baseline_in_two_passes(tmp_path):
+    positions, values = _tape_data()
+    source = tmp_path / "tape.dat"
+    write_tapestar_export(source, positions, values)
+    spec = TapeProduct.STANDARD1.value
+
+    streamed = assess_streaming(str(source), 'id', spec, 150.0, chunk_size=500)
+    assessor = TapeQualityAssessor(
+        TapeQualityInformation((positions, values), 'id', 150.0), spec)
+    assessor.assess_meets_specs()
+    assessor.determine_ok_tape_section(spec.min_tape_length)
+
+    assert ([r.passed for r in streamed.quality_reports] ==
+            [r.passed for r in assessor.quality_reports])
+    assert (np.array(_attributes(streamed.tape_quality_info.dropouts)) ==
+            pytest.approx(np.array(
+                _attributes(assessor.tape_quality_info.dropouts))))
+
+
+def test_streaming_keeps_at_most_max_history_before_chunk():
+    positions, values = _tape_data()
+
+    bounded = StreamingTapeAnalyzer('id', 150.0, 0.5, True,
+                                    max_history=1500)
+    for first in range(0, positions.size, 100):
+        bounded.update(positions[first:first + 100],
+                       values[first:first + 100])
+        assert bounded._values.size <= 1500 + 100
+
+    # without a baseline, peaks wait for the average of the whole tape
+    waiting = StreamingTapeAnalyzer('id', 150.0, None, True, max_history=700)
+    with pytest.raises(ValueError, match="More than max_history samples"):
+        for first in range(0, positions.size, 100):
+            waiting.update(positions[first:first + 100],
+                           values[first:first + 100])
+
+
+def test_streaming_rejects_descending_positions(tmp_path):
+    positions, values = _tape_data()
+    source = tmp_path / "tape.dat"
+    write_tapestar_export(source, positions[::-1], values[::-1])
+
+    with pytest.raises(ValueError, match="Positions must be ascending"):
+        assess_streaming(str(source), 'id', TapeProduct.SUPERLINK_PHASE.value,
+                         150.0, chunk_size=500)
+
+
+def test_live_assessor_rejects_whole_tape_baseline(tmp_path):
+    with pytest.raises(ValueError, match="can't be assessed live"):
+        LiveTapeAssessor(str(tmp_path / "tape.dat"), 'id',
+                         TapeProduct.STANDARD1.value, 150.0)
+
+
+@pytest.mark.parametrize("chunk_size", [37, 5000])
+@pytest.mark.parametrize("use_true_baseline", [False, True])
+def test_streaming_matches_batch_analysis_for_peak_chains(use_true_baseline,
+                                                          chunk_size):
+    positions, values = tape_with_peak_chains()
+    info = TapeQualityInformation((positions, values), 'id', 150.0)
+    info.calculate_piecewise_statistics(5.0)
+    info.calculate_drop_out_info(use_true_baseline)
+
+    analyzer = StreamingTapeAnalyzer('id', 150.0, 5.0, use_true_baseline,
+                                     max_history=20000)
+    dropouts = []
+    for first in range(0, positions.size, chunk_size):
+        update = analyzer.update(positions[first:first + chunk_size],
+                                 values[first:first + chunk_size])
+        dropouts += update.dropouts
+    dropouts += analyzer.finish().dropouts
+
+    assert len(info.dropouts) > 3
+    assert (np.array(_attributes(dropouts)) ==
+            pytest.approx(np.array(_attributes(info.dropouts))))
+
+
+def test_live_assessor_reports_isolated_drop_out_before_finish(tmp_path):
+    positions = np.arange(60000) * 1e-3
+    values = np.full(positions.size, 150.0)
+    values[4995:5005] = 10.0
+    rows = tapestar_rows(positions, values)
+    source = tmp_path / "tape.dat"
+    source.write_text(TAPESTAR_HEADER)
+    live = LiveTapeAssessor(str(source), 'id',
+                            TapeProduct.SUPERLINK_PHASE.value, 150.0)
+
+    reports = []
+    for first in range(0, len(rows), 5000):
+        with open(source, 'a', encoding='utf8') as file:
+            file.write("".join(rows[first:first + 5000]))
+        reports += live.poll()
+        if first >= 10000:
+            break
+
+    assert [report.test_type for report in reports] == [TestType.DROPOUT]
+    assert ([fail.center_position
+             for fail in reports[0].fail_information] ==
+            pytest.approx([5.0], abs=2e-3))
@@ -1,7 +1,9 @@
 import pytest
+import numpy as np
 import pandas as pd
 import quality_assessment.tape_quality_information as di
 from quality_assessment.products import TapeProduct
+from quality_assessment.data_types import AveragesInfo, TapeSection, TestType
 
 
 def test_data_setter_raises_type_error():
@@ -17,3 +19,145 @@ def test_data_setter_raises_value_error(exception_text: str,
                                         average_value: float):
     with pytest.raises(ValueError, match=exception_text):
         _ = di.TapeQualityInformation(pd.DataFrame(), 'id', average_value)
+
+
+def test_calculate_statistics_includes_trailing_piece():
+    positions = [i * 0.125 for i in range(26)]
+    values = [float(i) for i in range(26)]
+    data = pd.DataFrame({'x': positions, 'y': values})
+    info = di.TapeQualityInformation(data, 'id', 2.0)
+    info.calculate_statisitcs(TestType.AVERAGE, 1.0)
+    info.calculate_statisitcs(TestType.SCATTER, 1.0)
+
+    # tape starts at index 2 (first value above 0.8 * expected_average)
+    assert [a.start_position for a in info.averages] == pytest.approx(
+        [0.25, 1.375, 2.375])
+    assert [a.end_position for a in info.averages] == pytest.approx(
+        [1.375, 2.375, 3.125])
+    assert [a.value for a in info.averages] == pytest.approx([6.0, 14.5, 21.5])
+    assert info.scattering[0].value == pytest.approx(pd.Series(
+        values[2:11]).std())
+
+
+def test_piecewise_statistics_matches_single_calculations():
+    positions = [i * 0.125 for i in range(26)]
+    values = [100.0 + (i % 5) for i in range(26)]
+    data = pd.DataFrame({'x': positions, 'y': values})
+    fused = di.TapeQualityInformation(data, 'id', 100.0)
+    single = di.TapeQualityInformation(data.copy(), 'id', 100.0)
+    fused.calculate_piecewise_statistics(1.0)
+    single.calculate_statisitcs(TestType.AVERAGE, 1.0)
+    single.calculate_statisitcs(TestType.SCATTER, 1.0)
+
+    assert ([a.value for a in fused.averages] ==
+            pytest.approx([a.value for a in single.averages], nan_ok=True))
+    assert ([s.value for s in fused.scattering] ==
+            pytest.approx([s.value for s in single.scattering], nan_ok=True))
+
+
+def test_array_pair_gives_same_statistics_as_dataframe():
+    positions = np.array([i * 0.125 for i in range(26)])
+    values = np.array([100.0 + (i % 5) for i in range(26)])
+    from_arrays = di.TapeQualityInformation((positions, values), 'id', 100.0)
+    from_frame = di.TapeQualityInformation(
+        pd.DataFrame({'x': positions, 'y': values}), 'id', 100.0)
+    from_arrays.calculate_piecewise_statistics(1.0)
+    from_frame.calculate_piecewise_statistics(1.0)
+
+    assert ([a.value for a in from_arrays.averages] ==
+            pytest.approx([a.value for a in from_frame.averages], nan_ok=True))
+
+
+def test_tape_section_is_updated_when_inputs_change():
+    data = pd.DataFrame({'x': [0.0, 1.0, 2.0, 3.0, 4.0],
+                         'y': [10.0, 50.0, 100.0, 50.0, 10.0]})
+    info = di.TapeQualityInformation(data, 'id', 100.0)
+    assert info.tape_section == TapeSection(2.0, 2.0)
+
+    info.expected_average = 50.0
+    assert info.tape_section == TapeSection(1.0, 3.0)
+
+    info.data = pd.DataFrame({'x': [0.0, 1.0, 2.0], 'y': [50.0, 50.0, 10.0]})
+    assert info.tape_section == TapeSection(0.0, 1.0)
+
+
+def test_moving_averages_match_window_means():
+    positions = np.arange(0.0, 10.0, 0.125)
+    values = 2.0 + np.sin(positions)
+    info = di.TapeQualityInformation((positions, values), "ID", 2.0)
+    info.data = (positions, values + 1.0)
+
+    info.calculate_moving_statistics(1.0, 0.25)
+
+    starts = info.moving_averages.start_position
+    assert starts[:3].tolist() == [0.0, 0.25, 0.5]
+    assert info.moving_averages.end_position[-1] == positions[-1]
+    for start, end, value in zip(starts, info.moving_averages.end_position,
+                                 info.moving_averages.value):
+        window = (positions >= start) & (positions < end)
+        assert value == pytest.approx(np.mean(values[window] + 1.0))
+
+
+def test_results_are_shared_by_copies_until_data_changes():
+    positions = np.arange(0.0, 10.0, 0.125)
+    values = np.full(positions.size, 2.0)
+    info = di.TapeQualityInformation((positions, values), "ID", 2.0)
+    info.calculate_piecewise_statistics(1.0)
+    other = info.copy()
+
+    other.calculate_piecewise_statistics(1.0)
+    assert other.averages is info.averages
+    other.calculate_piecewise_statistics(2.0)
+    assert len(other.averages) == 5
+    assert len(info.averages) == 10
+
+    info.data = (positions, values + 1.0)
+    info.calculate_piecewise_statistics(1.0)
+    assert info.averages is not other.averages
+    assert info.averages.value[0] == 3.0
+
+
+def test_drop_outs_are_cached_per_baseline_piece_length():
+    positions = np.arange(0.0, 4.0, 1e-3)
+    values = np.where(positions < 2.0, 100.0, 200.0)
+    values[[1000, 3000]] = 50.0
+    info = di.TapeQualityInformation((positions, values), "ID", 100.0)
+
+    info.calculate_piecewise_statistics(None)
+    info.calculate_drop_out_info(True)
+    whole_length = info.dropouts
+    info.calculate_piecewise_statistics(2.0)
+    info.calculate_drop_out_info(True)
+    assert info.dropouts is not whole_length
+    assert info.dropouts.start_position[0] > whole_length.start_position[0]
+
+    other = info.copy()
+    other.calculate_piecewise_statistics(None)
+    other.calculate_drop_out_info(True)
+    assert other.dropouts is whole_length
+
+    other.averages = info.averages
+    other.calculate_drop_out_info(True)
+    assert other.dropouts is not info.dropouts
+    assert other.dropouts.start_position.tolist() == pytest.approx(
+        info.dropouts.start_position.tolist())
+
+
+def test_drop_outs_use_assigned_list_of_averages():
+    positions = np.arange(0.0, 4.0, 1e-3)
+    values = np.where(positions < 2.0, 100.0, 200.0)
+    values[[1000, 3000]] = 50.0
+    info = di.TapeQualityInformation((positions, values), "ID", 100.0)
+    info.calculate_piecewise_statistics(2.0)
+    info.calculate_drop_out_info(True)
+    expected = info.dropouts
+
+    other = info.copy()
+    other.averages = [AveragesInfo(0, 0.0, 2.0, 100.0),
+                      AveragesInfo(1, 2.0, 4.0, 200.0)]
+    other.calculate_drop_out_info(True)
+
+    assert other.dropouts.start_position.tolist() == pytest.approx(
+        expected.start_position.tolist())
+    assert other.dropouts.value.tolist() == pytest.approx(
+        expected.value.tolist())
@@ -0,0 +1,28 @@
+import numpy as np
+import pandas as pd
+import pytest
+from quality_assessment.tape_trace import TapeTrace
+
+
+def test_from_array_pair_does_not_copy():
+    positions = np.linspace(0.0, 1.0, 11)
+    values = np.full(11, 100.0)
+    trace = TapeTrace.from_data((positions, values))
+    assert np.shares_memory(trace.positions, positions)
+    assert np.shares_memory(trace.values, values)
+
+
+@pytest.mark.parametrize("data", [
+    pd.DataFrame({'x': [3.0, 2.0, 1.0], 'y': [30.0, 20.0, 10.0]}),
+    np.array([[3.0, 30.0], [2.0, 20.0], [1.0, 10.0]]),
+    ([3.0, 2.0, 1.0], [30.0, 20.0, 10.0])])
+def test_from_data_sorts_ascending(data):
+    trace = TapeTrace.from_data(data)
+    assert trace.positions.tolist() == [1.0, 2.0, 3.0]
+    assert trace.values.tolist() == [10.0, 20.0, 30.0]
+    assert trace.positions.flags.c_contiguous
+
+
+def test_from_data_raises_type_error():
+    with pytest.raises(TypeError, match=r"Wrong data type for data"):
+        _ = TapeTrace.from_data(10.0)